@@ -1,10 +1,37 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+import orjson
+import gzip
 import json
-import uuid
+import math
+import os
 import requests
 import time
-from typing import Dict, Any, List, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any, List, Optional, Tuple
+
+# Batch uploads: requests kept in flight at once, and attempts per batch when rate-limited (HTTP 429)
+MAX_CONCURRENT_BATCHES = 4
+MAX_BATCH_RETRIES = 5
+# Batches queued ahead of the workers; bodies are built only as they enter this window
+MAX_PENDING_BATCHES = 2 * MAX_CONCURRENT_BATCHES
+# Minimum seconds between upload progress widget updates
+PROGRESS_UPDATE_INTERVAL = 0.1
+
+# Fixed JSON fragments of a {"requests": [{"action": "addObject", "body": ...}, ...]} batch body
+_BATCH_HEAD = b'{"requests":[{"action":"addObject","body":'
+_BATCH_SEPARATOR = b'},{"action":"addObject","body":'
+_BATCH_TAIL = b'}]}'
+
+def _encode_json(value: Any, indent: bool = False) -> bytes:
+    """Encode with orjson, falling back to the stdlib for integers wider than 64 bits"""
+    try:
+        return orjson.dumps(value, option=orjson.OPT_INDENT_2 if indent else None)
+    except orjson.JSONEncodeError:
+        return json.dumps(value, ensure_ascii=False, indent=2 if indent else None).encode('utf-8')
 
 def check_record_size(record: Dict[str, Any]) -> int:
     """Check the size of a record in bytes"""
@@ -13,21 +40,13 @@ def check_record_size(record: Dict[str, Any]) -> int:
             st.error(f"check_record_size: Expected dict, got {type(record)}: {record}")
             return 0
         
-        # Clean the record before JSON serialization to avoid JSON compliance errors
+        # Clean the record before JSON serialization so non-finite floats are sized as uploaded
         cleaned_record = clean_json_incompatible_values(record)
-        return len(json.dumps(cleaned_record, ensure_ascii=False).encode('utf-8'))
-    except ValueError as e:
-        if "Out of range float values are not JSON compliant" in str(e):
-            st.warning(f"Found JSON-incompatible float values in record. Attempting to clean...")
-            try:
-                cleaned_record = clean_json_incompatible_values(record)
-                return len(json.dumps(cleaned_record, ensure_ascii=False).encode('utf-8'))
-            except Exception as clean_e:
-                st.error(f"Error cleaning record for size check: {clean_e}")
-                return 0
-        else:
-            st.error(f"JSON serialization error in record size check: {e}")
-            return 0
+        # orjson returns UTF-8 bytes directly, so no separate encode step is needed
+        return len(_encode_json(cleaned_record))
+    except (TypeError, ValueError) as e:
+        st.error(f"JSON serialization error in record size check: {e}")
+        return 0
     except Exception as e:
         st.error(f"Error checking record size: {e}")
         return 0
@@ -80,13 +99,14 @@ def truncate_large_fields(record: Dict[str, Any], max_size: int = 9000) -> Dict[
     
     return record_copy
 
-def validate_and_fix_records(records: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], bool]:
-    """Validate record sizes and check for records that are too large"""
+def validate_and_fix_records(records: List[Dict[str, Any]], already_clean: bool = False) -> Tuple[List[Dict[str, Any]], List[bytes], bool]:
+    """Validate record sizes, returning accepted records with their serialized JSON"""
     if not isinstance(records, list):
         st.error(f"Expected list of records, got {type(records)}")
-        return [], False
+        return [], [], False
         
     fixed_records = []
+    encoded_records = []
     large_records_info = []
     has_oversized_records = False
     
@@ -96,10 +116,14 @@ def validate_and_fix_records(records: List[Dict[str, Any]]) -> Tuple[List[Dict[s
                 st.warning(f"Record {i+1} is not a dictionary (got {type(record)}). Skipping.")
                 continue
             
-            # Clean JSON-incompatible values as an extra safety measure
-            record = clean_json_incompatible_values(record)
-                
-            record_size = check_record_size(record)
+            # Clean JSON-incompatible values as an extra safety measure, unless the
+            # caller guarantees it (orjson-parsed records never contain NaN/inf)
+            if not already_clean:
+                record = clean_json_incompatible_values(record)
+            
+            # Serialize once: the bytes give the record size and are reused for the upload
+            payload = _encode_json(record)
+            record_size = len(payload)
             
             if record_size > 10000:  # Algolia's limit
                 has_oversized_records = True
@@ -111,20 +135,11 @@ def validate_and_fix_records(records: List[Dict[str, Any]]) -> Tuple[List[Dict[s
                 continue  # Skip this record entirely
             else:
                 fixed_records.append(record)
+                encoded_records.append(payload)
         except Exception as e:
             st.error(f"Error processing record {i+1}: {e}")
-            # Try to include the record anyway after cleaning
-            try:
-                cleaned_record = clean_json_incompatible_values(record)
-                record_size = check_record_size(cleaned_record)
-                if record_size <= 10000:
-                    fixed_records.append(cleaned_record)
-                else:
-                    has_oversized_records = True
-                    large_records_info.append(f"Record {i+1}: {record_size} bytes (after cleaning)")
-            except Exception:
-                st.warning(f"Skipping record {i+1} due to unrecoverable errors")
-                continue
+            st.warning(f"Skipping record {i+1} due to unrecoverable errors")
+            continue
     
     # Show error if there are oversized records
     if has_oversized_records:
@@ -137,182 +152,285 @@ def validate_and_fix_records(records: List[Dict[str, Any]]) -> Tuple[List[Dict[s
         st.info("• Shorten long text fields")
         st.info("• Remove unnecessary data")
         st.info("• Split large records into multiple smaller records")
-        return [], False
+        return [], [], False
     
-    return fixed_records, True
+    return fixed_records, encoded_records, True
+
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_index_stats(app_id: str, admin_key: str, index_name: str) -> int:
+    """Fetch the record count of an index, or -1 if it doesn't exist (cached across reruns)"""
+    # Use search endpoint with empty query to get total record count
+    url = f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/query"
+    headers = {
+        "X-Algolia-API-Key": admin_key,
+        "X-Algolia-Application-Id": app_id,
+        "Content-Type": "application/json"
+    }
+    # Search with empty query and no results to just get the count
+    search_data = {"query": "", "hitsPerPage": 0}
+    response = requests.post(url, headers=headers, json=search_data, timeout=10)
+    
+    if response.status_code == 200:
+        data = response.json()
+        return data.get('nbHits', 0)
+    elif response.status_code == 404:
+        return -1  # Index doesn't exist
+    # Raise instead of returning so failures are never cached
+    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
 
 def get_index_stats(app_id: str, admin_key: str, index_name: str) -> int:
     """Get number of records in an Algolia index using search API"""
     try:
-        # Use search endpoint with empty query to get total record count
-        url = f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/query"
-        headers = {
-            "X-Algolia-API-Key": admin_key,
-            "X-Algolia-Application-Id": app_id,
-            "Content-Type": "application/json"
-        }
-        # Search with empty query and no results to just get the count
-        search_data = {"query": "", "hitsPerPage": 0}
-        response = requests.post(url, headers=headers, json=search_data, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            return data.get('nbHits', 0)
-        elif response.status_code == 404:
-            return -1  # Index doesn't exist
-        else:
-            st.error(f"❌ Error getting index stats: HTTP {response.status_code}")
-            return 0
+        return _fetch_index_stats(app_id, admin_key, index_name)
     except Exception as e:
         st.error(f"❌ Error getting index stats: {str(e)}")
         return 0
 
-def process_file(uploaded_file) -> List[Dict[str, Any]]:
-    """Process uploaded JSON or CSV file and return list of records"""
+def _load_json(buffer) -> Tuple[Any, bool]:
+    """Parse JSON bytes, returning the data and whether it is known to be free of NaN/inf"""
     try:
+        data = orjson.loads(buffer)
+    except orjson.JSONDecodeError:
+        # NaN/Infinity literals (as written by json.dumps) are rejected by orjson
+        return json.loads(bytes(buffer)), False
+    if _has_wide_ints(data):
+        # orjson turns integers wider than 64 bits into floats, which would corrupt IDs
+        return json.loads(bytes(buffer)), False
+    return data, True
+
+def process_file(uploaded_file) -> Tuple[List[Dict[str, Any]], bool]:
+    """Process uploaded JSON or CSV file, returning the records and whether they are already JSON-clean"""
+    try:
+        already_clean = True
         if uploaded_file.type == "application/json" or uploaded_file.name.endswith('.json'):
-            # Process JSON file
-            content = uploaded_file.read().decode('utf-8')
-            data = json.loads(content)
+            # Process JSON file. Streamlit already holds the upload in memory, so parse
+            # straight from its buffer instead of copying it out with read() first.
+            with uploaded_file.getbuffer() as buffer:
+                data, already_clean = _load_json(buffer)
             
-            if isinstance(data, list):
+            # Check the record shape once here; a non-object item would otherwise
+            # fail later while objectIDs are assigned
+            if isinstance(data, list) and all(type(item) is dict for item in data):
                 records = data
             elif isinstance(data, dict):
                 records = [data]
             else:
                 st.error("JSON file must contain an object or array of objects")
-                return []
+                return [], False
             
         elif uploaded_file.type == "text/csv" or uploaded_file.name.endswith('.csv'):
             # Process CSV file
             try:
                 df = pd.read_csv(uploaded_file)
-                records = df.to_dict('records')
                 
-                # Clean JSON-incompatible values from CSV data
+                # Clean JSON-incompatible values column-wise before building records
                 st.info("🧹 Cleaning CSV data for JSON compatibility...")
-                cleaned_records = []
-                for record in records:
-                    cleaned_record = clean_json_incompatible_values(record)
-                    cleaned_records.append(cleaned_record)
-                records = cleaned_records
+                df = df.replace([np.inf, -np.inf], ["Infinity", "-Infinity"])
+                df = df.astype(object).where(df.notna(), None)
+                records = df.to_dict('records')
                 st.success(f"✅ CSV data cleaned successfully!")
                 
             except Exception as e:
                 st.error(f"Error reading CSV file: {str(e)}")
-                return []
+                return [], False
         else:
             st.error("Unsupported file type. Please upload JSON or CSV files only.")
-            return []
+            return [], False
         
-        # Add objectID to each record if not present
-        for record in records:
-            if 'objectID' not in record:
-                record['objectID'] = str(uuid.uuid4())
+        # Add objectID to each record if not present, drawing all the random bytes at once
+        missing_ids = [record for record in records if 'objectID' not in record]
+        if missing_ids:
+            id_bytes = os.urandom(16 * len(missing_ids))
+            for i, record in enumerate(missing_ids):
+                record['objectID'] = id_bytes[i * 16:(i + 1) * 16].hex()
         
-        return records
+        return records, already_clean
         
     except Exception as e:
         st.error(f"Error processing file: {str(e)}")
-        return []
+        return [], False
+
+_ORJSON_INT_LIMIT = 2 ** 63   # orjson parses wider integers as floats
+
+def _has_wide_ints(value: Any) -> bool:
+    """Check a nested value for integral floats beyond 64 bits using an explicit stack"""
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        kind = type(current)
+        if kind is float:
+            if abs(current) >= _ORJSON_INT_LIMIT and current.is_integer():
+                return True
+        elif kind is dict:
+            stack.extend(current.values())
+        elif kind is list:
+            stack.extend(current)
+    return False
+
+def _has_non_finite(value: Any) -> bool:
+    """Check a nested value for NaN/inf floats using an explicit stack"""
+    isfinite = math.isfinite
+    stack = [value]
+    while stack:
+        current = stack.pop()
+        kind = type(current)
+        if kind is float:
+            if not isfinite(current):
+                return True
+        elif kind is dict:
+            stack.extend(current.values())
+        elif kind is list:
+            stack.extend(current)
+    return False
+
+def _clean_value(value: Any) -> Any:
+    """Replace NaN/inf floats in a value, recursing into dicts and lists"""
+    kind = type(value)
+    if kind is float:
+        if math.isnan(value):
+            return None  # Convert NaN to null
+        if math.isinf(value):
+            return "Infinity" if value > 0 else "-Infinity"  # Convert inf to string
+        return value
+    if kind is dict:
+        return {key: _clean_value(item) for key, item in value.items()}
+    if kind is list:
+        return [_clean_value(item) for item in value]
+    return value
 
 def clean_json_incompatible_values(record: Dict[str, Any]) -> Dict[str, Any]:
     """Clean record of JSON-incompatible float values (NaN, inf, -inf)"""
-    import math
-    
     if not isinstance(record, dict):
         return record
     
-    cleaned_record = {}
-    for key, value in record.items():
-        if isinstance(value, float):
-            if math.isnan(value):
-                cleaned_record[key] = None  # Convert NaN to null
-            elif math.isinf(value):
-                if value > 0:
-                    cleaned_record[key] = "Infinity"  # Convert +inf to string
-                else:
-                    cleaned_record[key] = "-Infinity"  # Convert -inf to string
-            else:
-                cleaned_record[key] = value
-        elif isinstance(value, dict):
-            cleaned_record[key] = clean_json_incompatible_values(value)
-        elif isinstance(value, list):
-            cleaned_record[key] = [clean_json_incompatible_values(item) if isinstance(item, dict) else 
-                                 (None if isinstance(item, float) and math.isnan(item) else
-                                  "Infinity" if isinstance(item, float) and math.isinf(item) and item > 0 else
-                                  "-Infinity" if isinstance(item, float) and math.isinf(item) and item < 0 else item)
-                                 for item in value]
-        else:
-            cleaned_record[key] = value
+    # Most records contain no NaN/inf, so only rebuild when the scan finds one
+    if not _has_non_finite(record):
+        return record
     
-    return cleaned_record
+    return _clean_value(record)
+
+def _algolia_session(app_id: str, admin_key: str) -> requests.Session:
+    """Create a pooled HTTP session carrying the Algolia credentials"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MAX_CONCURRENT_BATCHES)
+    session.mount("https://", adapter)
+    session.headers.update({
+        "X-Algolia-API-Key": admin_key,
+        "X-Algolia-Application-Id": app_id,
+        "Content-Type": "application/json"
+    })
+    return session
 
-def upload_to_algolia(app_id: str, admin_key: str, index_name: str, records: List[Dict[str, Any]], batch_size: int = 1000, replace_index: bool = False) -> bool:
+def _encode_batch(encoded_records: List[bytes]) -> bytes:
+    """Assemble a batch request body from already-serialized records"""
+    # Every request in a batch has the same addObject shape, so the records are
+    # spliced between fixed byte fragments instead of wrapping each one in a dict
+    return _BATCH_HEAD + _BATCH_SEPARATOR.join(encoded_records) + _BATCH_TAIL
+
+def _dedupe_object_ids(records: List[Dict[str, Any]], encoded_records: List[bytes]) -> Tuple[List[Dict[str, Any]], List[bytes]]:
+    """Keep only the last record per objectID, matching a sequential upload's last-write-wins result"""
+    last_index = {}
+    for i, record in enumerate(records):
+        object_id = record.get('objectID')
+        if object_id is not None:
+            last_index[object_id] = i
+    if len(last_index) == len(records):
+        return records, encoded_records
+    keep = [i for i, record in enumerate(records) if last_index.get(record.get('objectID'), i) == i]
+    if len(keep) == len(records):
+        return records, encoded_records
+    return [records[i] for i in keep], [encoded_records[i] for i in keep]
+
+def _post_batch(session: requests.Session, url: str, payload: bytes) -> requests.Response:
+    """POST a serialized batch gzip-compressed, backing off exponentially while Algolia rate-limits us"""
+    # Record JSON compresses well and level 1 is cheap; zlib releases the GIL,
+    # so batches are compressed in parallel on the worker threads
+    body = gzip.compress(payload, compresslevel=1)
+    delay = 1.0
+    for attempt in range(MAX_BATCH_RETRIES):
+        response = session.post(url, data=body, headers={"Content-Encoding": "gzip"}, timeout=60)
+        if response.status_code != 429 or attempt == MAX_BATCH_RETRIES - 1:
+            break
+        time.sleep(delay)
+        delay *= 2
+    return response
+
+def upload_to_algolia(app_id: str, admin_key: str, index_name: str, records: List[Dict[str, Any]], batch_size: int = 1000, replace_index: bool = False, encoded_records: Optional[List[bytes]] = None) -> bool:
     """Upload records to Algolia index using REST API"""
     try:
-        # Start timing the upload
-        start_time = time.time()
-        if replace_index:
-            # Clear the index first
-            clear_url = f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/clear"
-            headers = {
-                "X-Algolia-API-Key": admin_key,
-                "X-Algolia-Application-Id": app_id,
-                "Content-Type": "application/json"
-            }
-            clear_response = requests.post(clear_url, headers=headers, timeout=30)
-            if clear_response.status_code not in [200, 201]:
-                st.error(f"Failed to clear index: {clear_response.status_code}")
-                return False
-            
-            st.info("✅ Index cleared successfully")
-            time.sleep(2)  # Wait for clearing to complete
-        
-        # Upload in batches
-        total_records = len(records)
-        total_batches = (total_records + batch_size - 1) // batch_size
-        
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        # Reuse the JSON produced during validation when the caller has it
+        if encoded_records is None:
+            encoded_records = [_encode_json(record) for record in records]
         
-        url = f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/batch"
-        headers = {
-            "X-Algolia-API-Key": admin_key,
-            "X-Algolia-Application-Id": app_id,
-            "Content-Type": "application/json"
-        }
+        # Batches can finish in any order, so a later duplicate must not race an earlier one
+        unique_records, encoded_records = _dedupe_object_ids(records, encoded_records)
+        if len(unique_records) < len(records):
+            st.info(f"ℹ️ {len(records) - len(unique_records)} records share an objectID with a later record; only the last one is uploaded")
+            records = unique_records
         
-        for i in range(0, total_records, batch_size):
-            batch = records[i:i + batch_size]
-            batch_num = (i // batch_size) + 1
-            
-            status_text.text(f"Uploading batch {batch_num}/{total_batches} ({len(batch)} records)...")
-            
-            # Prepare batch request
-            batch_requests = []
-            for record in batch:
-                batch_requests.append({
-                    "action": "addObject",
-                    "body": record
-                })
-            
-            payload = {"requests": batch_requests}
+        # Start timing the upload
+        start_time = time.time()
+        with _algolia_session(app_id, admin_key) as session:
+            if replace_index:
+                # Clear the index first
+                clear_url = f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/clear"
+                clear_response = session.post(clear_url, timeout=30)
+                if clear_response.status_code not in [200, 201]:
+                    st.error(f"Failed to clear index: {clear_response.status_code}")
+                    return False
+                
+                st.info("✅ Index cleared successfully")
+                time.sleep(2)  # Wait for clearing to complete
             
-            # Upload batch
-            response = requests.post(url, headers=headers, json=payload, timeout=60)
+            # Upload in batches
+            total_records = len(records)
+            total_batches = (total_records + batch_size - 1) // batch_size
             
-            if response.status_code not in [200, 201]:
-                st.error(f"Batch {batch_num} failed: {response.status_code} - {response.text}")
-                return False
+            progress_bar = st.progress(0)
+            status_text = st.empty()
             
-            # Update progress
-            progress = min(1.0, (i + len(batch)) / total_records)
-            progress_bar.progress(progress)
+            url = f"https://{app_id}-dsn.algolia.net/1/indexes/{index_name}/batch"
             
-            # Small delay between batches
-            if batch_num < total_batches:
-                time.sleep(0.5)
+            with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_BATCHES) as executor:
+                status_text.text(f"Uploading {total_batches} batches ({MAX_CONCURRENT_BATCHES} at a time)...")
+                
+                uploaded_records = 0
+                completed_batches = 0
+                last_update = 0.0
+                batch_starts = iter(range(0, total_records, batch_size))
+                pending = {}
+                while True:
+                    # Top up the window, serializing each batch body only as it is submitted
+                    for i in islice(batch_starts, MAX_PENDING_BATCHES - len(pending)):
+                        batch = encoded_records[i:i + batch_size]
+                        pending[executor.submit(_post_batch, session, url, _encode_batch(batch))] = ((i // batch_size) + 1, len(batch))
+                    if not pending:
+                        break
+                    
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch_num, batch_len = pending.pop(future)
+                        try:
+                            response = future.result()
+                        except Exception as e:
+                            # Drop the queued batches so a timeout doesn't wait on every remaining post
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            st.error(f"Batch {batch_num} failed: {e}")
+                            return False
+                        
+                        if response.status_code not in [200, 201]:
+                            st.error(f"Batch {batch_num} failed: {response.status_code} - {response.text}")
+                            executor.shutdown(wait=False, cancel_futures=True)
+                            return False
+                        
+                        # Update progress, at most ~10 times a second since each update is a browser round-trip
+                        uploaded_records += batch_len
+                        completed_batches += 1
+                        now = time.monotonic()
+                        if now - last_update >= PROGRESS_UPDATE_INTERVAL or completed_batches == total_batches:
+                            status_text.text(f"Uploaded batch {completed_batches}/{total_batches} ({batch_len} records)...")
+                            progress_bar.progress(min(1.0, uploaded_records / total_records))
+                            last_update = now
         
         # Calculate upload time
         end_time = time.time()
@@ -338,53 +456,63 @@ def upload_to_algolia(app_id: str, admin_key: str, index_name: str, records: Lis
         st.error(f"Upload failed: {str(e)}")
         return False
 
+@st.cache_data(ttl=60, show_spinner=False)
+def _fetch_indices(app_id: str, admin_key: str) -> List[Dict[str, Any]]:
+    """Fetch the indices of an application (cached across reruns)"""
+    url = f"https://{app_id}-dsn.algolia.net/1/indexes"
+    headers = {
+        "X-Algolia-API-Key": admin_key,
+        "X-Algolia-Application-Id": app_id,
+        "Content-Type": "application/json"
+    }
+    response = requests.get(url, headers=headers, timeout=10)
+    
+    if response.status_code == 200:
+        data = response.json()
+        return data.get('items', [])
+    # Raise instead of returning so failures are never cached
+    raise requests.HTTPError(f"HTTP {response.status_code}", response=response)
+
 def get_existing_indices(app_id: str, admin_key: str):
     """Display existing indices"""
     st.subheader("📋 Your Existing Indices")
     
     with st.expander("👀 View Your Current Indices", expanded=False):
+        if st.button("🔄 Refresh", key="upload_refresh_indices", help="Fetch the latest index list from Algolia"):
+            _fetch_indices.clear()
+        
         try:
-            url = f"https://{app_id}-dsn.algolia.net/1/indexes"
-            headers = {
-                "X-Algolia-API-Key": admin_key,
-                "X-Algolia-Application-Id": app_id,
-                "Content-Type": "application/json"
-            }
-            response = requests.get(url, headers=headers, timeout=10)
+            indices = _fetch_indices(app_id, admin_key)
             
-            if response.status_code == 200:
-                data = response.json()
-                indices = data.get('items', [])
-                
-                st.success(f"✅ Successfully retrieved {len(indices)} indices")
+            st.success(f"✅ Successfully retrieved {len(indices)} indices")
+            
+            if indices:
+                st.write(f"**Found {len(indices)} indices in your account:**")
                 
-                if indices:
-                    st.write(f"**Found {len(indices)} indices in your account:**")
-                    
-                    # Create a nice table display
-                    indices_data = []
-                    for idx in indices:
-                        name = idx.get('name', 'N/A')
-                        entries = idx.get('entries', 0)
-                        created = idx.get('createdAt', 'N/A')
-                        updated = idx.get('updatedAt', 'N/A')
-                        
-                        indices_data.append({
-                            "Index Name": name,
-                            "Records": f"{entries:,}",
-                            "Created": created,
-                            "Updated": updated
-                        })
+                # Create a nice table display
+                indices_data = []
+                for idx in indices:
+                    name = idx.get('name', 'N/A')
+                    entries = idx.get('entries', 0)
+                    created = idx.get('createdAt', 'N/A')
+                    updated = idx.get('updatedAt', 'N/A')
                     
-                    # Display as dataframe
-                    if indices_data:
-                        df = pd.DataFrame(indices_data)
-                        st.dataframe(df, use_container_width=True)
-                else:
-                    st.info("No indices found in your account")
+                    indices_data.append({
+                        "Index Name": name,
+                        "Records": f"{entries:,}",
+                        "Created": created,
+                        "Updated": updated
+                    })
+                
+                # Display as dataframe
+                if indices_data:
+                    df = pd.DataFrame(indices_data)
+                    st.dataframe(df, use_container_width=True)
             else:
-                st.error(f"Failed to retrieve indices: {response.status_code}")
+                st.info("No indices found in your account")
                 
+        except requests.HTTPError as e:
+            st.error(f"Failed to retrieve indices: {e.response.status_code}")
         except Exception as e:
             st.error(f"Error retrieving indices: {str(e)}")
 
@@ -408,7 +536,7 @@ def algolia_upload_app(app_id: str, admin_key: str):
         
         # Index Name Input
         st.subheader("📝 Index Name")
-        col1, col2 = st.columns([3, 1])
+        col1, col2 = st.columns([3, 1], vertical_alignment="bottom")
         
         with col1:
             index_name = st.text_input(
@@ -419,7 +547,6 @@ def algolia_upload_app(app_id: str, admin_key: str):
             )
         
         with col2:
-            st.write("")  # Add some spacing
             if st.button("📊 Get Index Stats", key="upload_get_stats"):
                 if index_name:
                     with st.spinner("Getting index stats..."):
@@ -447,7 +574,7 @@ def algolia_upload_app(app_id: str, admin_key: str):
         if uploaded_file:
             # Process and display file info
             try:
-                records = process_file(uploaded_file)
+                records, already_clean = process_file(uploaded_file)
                 if records:
                     st.success(f"✅ File processed successfully! Found {len(records)} records")
                     
@@ -490,18 +617,23 @@ def algolia_upload_app(app_id: str, admin_key: str):
                     
                     # Upload button and logic
                     if st.button("🚀 Upload to Algolia", type="primary", key="upload_button") and index_name:
-                        # Validate records first - no truncation, just validation
-                        fixed_records, validation_success = validate_and_fix_records(records)
+                        # Validate records first - no truncation, just validation.
+                        # The cleaning pass is skipped only when process_file took the orjson fast path.
+                        fixed_records, encoded_records, validation_success = validate_and_fix_records(records, already_clean=already_clean)
                         
                         if not validation_success:
                             st.stop()  # Stop execution if validation failed
                         
                         success = upload_to_algolia(
                             app_id, admin_key, index_name, fixed_records, batch_size, 
-                            upload_mode == "Replace Index"
+                            upload_mode == "Replace Index", encoded_records
                         )
                         
                         if success:
+                            # Record counts changed, so drop the cached index list and stats
+                            _fetch_indices.clear()
+                            _fetch_index_stats.clear()
+                            
                             # Show toast notification for upload success
                             st.toast(f"✅ Data uploaded successfully in {st.session_state.upload_time_text}!", icon="🎉")
                             
@@ -534,7 +666,7 @@ def algolia_upload_app(app_id: str, admin_key: str):
                                             st.json(fixed_records, expanded=False)
                                 
                                 # Download option for the processed data
-                                processed_json = json.dumps(fixed_records, indent=2, ensure_ascii=False)
+                                processed_json = _encode_json(fixed_records, indent=True)
                                 st.download_button(
                                     label=f"💾 Download Processed Data ({len(fixed_records)} records)",
                                     data=processed_json,
@@ -6,21 +6,43 @@ Streamlit UI for Algolia MCP – FINAL FIXED VERSION
 • Includes AI Chat Assistant functionality
 """
  
-import os, json, asyncio, threading, time, atexit
+import os, re, sys, json, html, asyncio, threading, time, atexit
 from contextlib import AsyncExitStack
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from dataclasses import dataclass
+from itertools import islice
 from datetime import datetime
+from operator import attrgetter
+from pathlib import Path
+from time import perf_counter
  
+import orjson
+import pandas as pd
 import streamlit as st
-import nest_asyncio
 from dotenv import load_dotenv
 from mcp import ClientSession, StdioServerParameters
 from mcp.client.stdio import stdio_client
+from mcp.types import TextContent
 from algolia_uploader import algolia_upload_app  # type: ignore
 
-# Apply nest_asyncio patch for Streamlit compatibility
-nest_asyncio.apply()
+@st.cache_resource(show_spinner=False)
+def load_env() -> bool:
+    """Load .env into the process environment once per server process"""
+    return load_dotenv()
+
+load_env()
+
+# Add mcp-node to path if not already there
+_MCP_NODE_PATH = os.path.join(os.path.dirname(__file__), 'mcp-node')
+if _MCP_NODE_PATH not in sys.path:
+    sys.path.insert(0, _MCP_NODE_PATH)
+
+# Try to import uvloop for a faster MCP worker event loop (optional, not on Windows)
+try:
+    import uvloop
+    UVLOOP_AVAILABLE = True
+except ImportError:
+    UVLOOP_AVAILABLE = False
 
 # Try to import OpenAI for chat functionality (optional)
 try:
@@ -30,10 +52,15 @@ except ImportError:
     OPENAI_AVAILABLE = False
     st.warning("⚠️ OpenAI not installed. Chat functionality will be limited.")
 
+# Azure OpenAI settings for the chat tab (read after .env has been loaded)
+AZURE_ENDPOINT = os.getenv("AZURE_OPENAI_API_BASE")
+AZURE_KEY = os.getenv("AZURE_OPENAI_API_KEY")
+AZURE_VER = "2025-02-01-preview"
+
 # ──────────────────────────────────
 # Chat Message Classes (from algolia_query.py)
 # ──────────────────────────────────
-@dataclass
+@dataclass(slots=True)
 class ToolCall:
     name: str
     arguments: Dict[str, Any]
@@ -41,7 +68,7 @@ class ToolCall:
     success: bool
     timestamp: str
 
-@dataclass
+@dataclass(slots=True)
 class ChatMessage:
     role: str  # 'user', 'assistant', 'tool'
     content: str
@@ -51,10 +78,17 @@ class ChatMessage:
 # ──────────────────────────────────
 # OpenAI Schema Conversion Functions
 # ──────────────────────────────────
+_LEAF_KEYS = frozenset({"type", "description"})
+_EXTRA_KEYS = frozenset({"minimum", "maximum", "minLength", "maxLength",
+                         "pattern", "enum", "example"})
+
 def _simplify_schema_prop(pn: str, pd: Any) -> dict:
     if not isinstance(pd, dict):
         return {"type": "string", "description": f"Parameter {pn}"}
     ptype = pd.get("type", "string")
+    # most properties are plain scalar leaves – nothing to copy beyond type/description
+    if type(ptype) is str and ptype != "array" and ptype != "object" and pd.keys() <= _LEAF_KEYS:
+        return {"type": ptype, "description": pd.get("description", f"Parameter {pn}")}
     if isinstance(ptype, list):       # pick first
         ptype = ptype[0] if ptype else "string"
  
@@ -71,9 +105,8 @@ def _simplify_schema_prop(pn: str, pd: Any) -> dict:
             out["properties"] = {k: _simplify_schema_prop(k, v)
                                  for k, v in pd["properties"].items()}
  
-    for k in ("minimum", "maximum", "minLength", "maxLength",
-              "pattern", "enum", "example"):
-        if k in pd:
+    for k in pd:                      # schema order keeps the generated specs stable
+        if k in _EXTRA_KEYS:
             out[k] = pd[k]
     return out
  
@@ -98,7 +131,7 @@ def to_openai_schema(tool) -> dict:
 # ──────────────────────────────────
 # Argument Validation Classes
 # ──────────────────────────────────
-@dataclass
+@dataclass(slots=True)
 class ValidationResult:
     success: bool
     arguments: Dict[str, Any]
@@ -118,18 +151,23 @@ class ArgPreparer:
                 schema: Dict[str, Any],
                 supplied: Dict[str, Any],
                 tool_name: str) -> ValidationResult:
-        res = ValidationResult(True, dict(supplied), [], [], [])
+        # Well-formed calls hand back the supplied dict itself; it is copied
+        # only when a default has to be filled in
+        res = ValidationResult(True, supplied, [], [], [])
         if not isinstance(schema, dict):
             res.errors.append("tool schema not dict"); res.success = False
             return res
  
         props = schema.get("properties", {})
         required = schema.get("required", [])
+        get_prop = props.get
  
         for fld in required:
             if fld not in res.arguments or res.arguments[fld] in ("", None, [], {}):
-                val = self._default_for(fld, props.get(fld, {}), tool_name)
+                val = self._default_for(fld, get_prop(fld, {}), tool_name)
                 if val is not None:
+                    if res.arguments is supplied:
+                        res.arguments = dict(supplied)
                     res.arguments[fld] = val
                     res.warnings.append(f"auto-filled '{fld}'")
                 else:
@@ -138,20 +176,28 @@ class ArgPreparer:
  
         # simple type check
         for n, v in res.arguments.items():
-            if n in props and not self._type_ok(v, props[n].get("type", "string")):
+            spec = get_prop(n)
+            if spec is not None and not self._type_ok(v, spec.get("type", "string")):
                 res.errors.append(f"'{n}' wrong type")
                 res.success = False
         return res
  
+    _TYPE_CHECKS = {
+        "string":  lambda v: isinstance(v, str),
+        "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+        "number":  lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+        "boolean": lambda v: isinstance(v, bool),
+        "array":   lambda v: isinstance(v, list),
+        "object":  lambda v: isinstance(v, dict),
+        "null":    lambda v: v is None,
+    }
+
     @staticmethod
     def _type_ok(val, etype):
-        return ((etype == "string"  and isinstance(val, str)) or
-                (etype == "integer" and isinstance(val, int) and not isinstance(val, bool)) or
-                (etype == "number"  and isinstance(val, (int, float)) and not isinstance(val, bool)) or
-                (etype == "boolean" and isinstance(val, bool)) or
-                (etype == "array"   and isinstance(val, list)) or
-                (etype == "object"  and isinstance(val, dict)) or
-                etype not in ("string","integer","number","boolean","array","object"))
+        if isinstance(etype, list):   # JSON-Schema union, e.g. ["string", "null"]
+            return any(ArgPreparer._type_ok(val, t) for t in etype)
+        check = ArgPreparer._TYPE_CHECKS.get(etype) if isinstance(etype, str) else None
+        return check is None or check(val)
  
     def _default_for(self, fld, fld_schema, tool_name):
         if fld in self.GLOBAL_DEFAULTS:
@@ -170,7 +216,18 @@ class ArgPreparer:
 # ──────────────────────────────────
 # Serialization helpers
 # ──────────────────────────────────
+def _text(item) -> str:
+    """Text of an MCP content block, or its string form for anything else"""
+    t = getattr(item, "text", None)
+    return t if t is not None else str(item)
+
+_PRIMITIVES = frozenset({str, int, float, bool, type(None)})
+_CONVERTERS = {TextContent: attrgetter("text")}   # exact-type fast path for MCP content
+
 def make_serialisable(obj):
+    convert = _CONVERTERS.get(type(obj))
+    if convert is not None:
+        return convert(obj)
     if hasattr(obj, "text"):        # Algolia TextContent
         return obj.text
     if hasattr(obj, "model_dump"):  # pydantic
@@ -178,14 +235,35 @@ def make_serialisable(obj):
     if hasattr(obj, "__dict__"):
         return vars(obj)
     return obj  # primitives fine
- 
+
 def serialise(data):
+    if type(data) in _PRIMITIVES:   # exact-type fast path for JSON leaves
+        return data
     if isinstance(data, (list, tuple)):
         return [serialise(x) for x in data]
     if isinstance(data, dict):
         return {k: serialise(v) for k, v in data.items()}
     return make_serialisable(data)
 
+def _fastjson(obj):
+    """Pre-encode a value for st.json with orjson instead of Streamlit's stdlib json.dumps"""
+    try:
+        return orjson.dumps(obj, default=repr, option=orjson.OPT_NON_STR_KEYS).decode()
+    except orjson.JSONEncodeError:   # e.g. integers beyond 64 bits – let st.json cope
+        return obj
+
+def _clean_items(record: Dict[str, Any], n: int = 8) -> List[Tuple[str, Any]]:
+    """First n fields of a hit, skipping objectID and Algolia's _-prefixed metadata"""
+    return list(islice(((k, v) for k, v in record.items()
+                        if k[:1] != '_' and k != 'objectID'), n))
+
+def _render_field(value):
+    """Markdown for a scalar sample field (clipped at 100 chars), or the value itself for st.json"""
+    if isinstance(value, (list, dict)):
+        return None, value
+    text = str(value)
+    return (f"`{text[:100]}...`" if len(text) > 100 else f"`{text}`"), None
+
 # ──────────────────────────────────
 # Chat UI Helper Functions
 # ──────────────────────────────────
@@ -209,6 +287,13 @@ def display_tool_call(tool_call: ToolCall):
         
         st.caption(f"⏰ Executed at: {tool_call.timestamp}")
 
+def _has_side_effects(tool) -> bool:
+    """True when an MCP tool explicitly declares that it is not read-only"""
+    annotations = getattr(tool, "annotations", None)
+    return annotations is not None and getattr(annotations, "readOnlyHint", None) is False
+
+_CHAT_WINDOW = 20   # chat messages rendered per rerun before older ones are folded away
+
 def display_chat_message(message: ChatMessage):
     """Display a chat message with proper formatting"""
     timestamp = message.timestamp
@@ -230,10 +315,56 @@ def display_chat_message(message: ChatMessage):
             
             st.caption(f"🕒 {timestamp}")
 
+_HISTORY_CHAR_BUDGET = 24000   # rough cap on conversation characters sent with each completion
+
+def _msg_field(message, name: str):
+    """Read a field from a dict message or an SDK message object"""
+    return message.get(name) if isinstance(message, dict) else getattr(message, name, None)
+
+def trim_history(messages: List[Any]) -> List[Any]:
+    """Drop the oldest whole turns until the conversation fits the character budget"""
+    system, rest = messages[0], messages[1:]
+    sizes = [len(_msg_field(m, "content") or "") for m in rest]
+    total, start = sum(sizes), 0
+    while total > _HISTORY_CHAR_BUDGET:
+        # Cut at the next user message so tool results never lose their tool_calls message
+        nxt = next((i for i in range(start + 1, len(rest))
+                    if _msg_field(rest[i], "role") == "user"), None)
+        if nxt is None:
+            break
+        total -= sum(sizes[start:nxt])
+        start = nxt
+    return [system, *rest[start:]] if start else messages
+
+def stream_text(stream):
+    """Yield the text deltas of a streamed chat completion"""
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
 def get_timestamp():
     """Get current timestamp in a readable format"""
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
+def _fmt_dur(seconds: float) -> str:
+    """Human-readable duration for the API timing toasts"""
+    return f"{seconds*1000:.0f} milliseconds" if seconds < 1 else f"{seconds:.2f} seconds"
+
+def _fmt_iso_column(values, fmt: str = "%Y-%m-%d %H:%M"):
+    """Vectorised _fmt_iso for a pandas Series of ISO-8601 timestamps"""
+    formatted = pd.to_datetime(values, utc=True, errors="coerce", format="ISO8601").dt.strftime(fmt)
+    formatted = formatted.fillna(values).fillna("")   # unparseable values are shown as-is
+    return formatted.mask(formatted == "", "Unknown")
+
+def _fmt_iso(value: str, fmt: str = "%Y-%m-%d %H:%M") -> str:
+    """Format an ISO-8601 timestamp from Algolia, falling back to the raw value"""
+    if not value:
+        return "Unknown"
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).strftime(fmt)
+    except (ValueError, AttributeError):
+        return value
+
 def fallback_prompt(app_id: str) -> str:
     return f"""You are an intelligent assistant that helps users interact with Algolia search engine through various tools.
 
@@ -255,37 +386,31 @@ Instructions:
 When a user asks about Algolia functionality, choose the most appropriate tool(s) and explain your reasoning.
 """
  
-import os, json, asyncio, threading, time
-from contextlib import AsyncExitStack
-from typing import Dict, Any, List, Optional
- 
-import streamlit as st
-from dotenv import load_dotenv
-from mcp import ClientSession, StdioServerParameters
-from mcp.client.stdio import stdio_client
- 
  
 ########################################################################
 # ---------- MCP CLIENT (unchanged API names, adds applicationId) ---- #
 ########################################################################
  
 class AlgoliaMCPClient:
-    def __init__(self, mcp_node_path: Optional[str] = None):
-        load_dotenv()
-        self.app_id  = os.getenv("ALGOLIA_APP_ID")
-        self.api_key = os.getenv("ALGOLIA_API_KEY")
+    def __init__(self, mcp_node_path: Optional[str] = None,
+                 app_id: Optional[str] = None, api_key: Optional[str] = None):
+        self.app_id  = app_id or os.getenv("ALGOLIA_APP_ID")
+        self.api_key = api_key or os.getenv("ALGOLIA_API_KEY")
         self.mcp_path = mcp_node_path or os.getenv("MCP_NODE_PATH", "./mcp-node")
         if not all([self.app_id, self.api_key]):
             raise RuntimeError("ALGOLIA_APP_ID and ALGOLIA_API_KEY missing")
         self.exit_stack = AsyncExitStack()
         self.tools: list = []
+        self._openai_tools = None   # (specs, name_map) built from self.tools on first use
         self.session = None
         self.loop: asyncio.AbstractEventLoop = None
  
     # ---------- event-loop helpers ----------
     def _ensure_loop(self):
         if self.loop is None:
-            self.loop = asyncio.new_event_loop()
+            # All MCP I/O runs on this private worker loop and is reached through
+            # run_coroutine_threadsafe, so it never needs nested run() support
+            self.loop = uvloop.new_event_loop() if UVLOOP_AVAILABLE else asyncio.new_event_loop()
             threading.Thread(target=self.loop.run_forever, daemon=True).start()
  
     def run_async(self, awaitable):
@@ -295,6 +420,8 @@ class AlgoliaMCPClient:
  
     # ---------- connection ----------
     async def connect(self) -> bool:
+        if self.session is not None:   # already running – reuse the live server
+            return True
         try:
             params = StdioServerParameters(
                 command="node",
@@ -318,6 +445,19 @@ class AlgoliaMCPClient:
         except Exception as e:
             return {"success": False, "error": str(e)}
  
+    def openai_tools(self):
+        """OpenAI function specs and a name→tool map, converted once per connection"""
+        if self._openai_tools is None:
+            specs, name_map = [], {}
+            for t in self.tools:
+                try:
+                    specs.append(to_openai_schema(t))
+                    name_map[t.name] = t
+                except Exception as ex:
+                    st.warning(f"⚠️ Skipped tool {t.name}: {ex}")
+            self._openai_tools = (specs, name_map)
+        return self._openai_tools
+ 
     # ---------- convenience wrappers with correct names ----------
     async def get_user(self):            return await self.call_tool("getUserInfo", {})
     async def get_apps(self):            return await self.call_tool("getApplications", {})
@@ -353,6 +493,21 @@ class AlgoliaMCPClient:
                                     {"applicationId": app_id, "index": index,
                                      "startDate": start, "endDate": end})
  
+    async def index_details(self, app_id, index):
+        """Fetch two sample records and the settings of an index concurrently"""
+        return await asyncio.gather(self.search(app_id, index, "", 2, 0),
+                                    self.get_settings(app_id, index))
+
+    async def call_tools(self, calls: List[Tuple[str, Dict[str, Any]]], concurrent: bool = True):
+        """Run several tool calls, overlapping their round-trips unless told to keep them in order"""
+        if concurrent:
+            return await asyncio.gather(*(self.call_tool(name, args) for name, args in calls))
+        return [await self.call_tool(name, args) for name, args in calls]
+
+    async def bootstrap(self):
+        """Fetch the application list and user info in one concurrent round-trip"""
+        return await asyncio.gather(self.get_apps(), self.get_user())
+ 
     async def disconnect(self):
         try:
             # Close session first if it exists
@@ -375,6 +530,7 @@ class AlgoliaMCPClient:
             
             # Reset tools
             self.tools = []
+            self._openai_tools = None
             
             # Stop the event loop if it's running
             if self.loop and self.loop.is_running():
@@ -389,11 +545,226 @@ class AlgoliaMCPClient:
             # If all else fails, just reset everything
             self.session = None
             self.tools = []
+            self._openai_tools = None
             self.exit_stack = AsyncExitStack()
             self.loop = None
             # Don't raise the error, just log it
             print(f"Warning: Disconnect cleanup error (ignored): {e}")
 
+def _client_alive(client: AlgoliaMCPClient) -> bool:
+    """Ping a cached client's MCP session so a dead Node server is replaced on the next connect"""
+    if client.session is None:
+        return False
+    try:
+        client.run_async(asyncio.wait_for(client.session.send_ping(), timeout=5))
+        return True
+    except Exception:
+        _shutdown_client(client)   # release what is left of the old server before starting a new one
+        return False
+
+@st.cache_resource(show_spinner=False, validate=_client_alive)
+def get_mcp_client(app_id: str, api_key: str) -> AlgoliaMCPClient:
+    """Start the MCP server once per credential pair and share it across reruns"""
+    client = AlgoliaMCPClient(app_id=app_id, api_key=api_key)
+    if not client.run_async(client.connect()):
+        raise RuntimeError("MCP Server connection failed")   # raising keeps failures uncached
+    atexit.register(_shutdown_client, client)
+    return client
+
+@st.cache_data(show_spinner=False)
+def load_system_prompt(app_id: str) -> str:
+    """Read the chat system prompt once, falling back to the built-in prompt for this app"""
+    try:
+        return Path(__file__).with_name("algolia_system_prompt.txt").read_text(encoding="utf-8")
+    except FileNotFoundError:
+        return fallback_prompt(app_id)
+
+@st.cache_resource(show_spinner=False)
+def get_azure_client(endpoint: str, api_key: str, api_version: str) -> "AzureOpenAI":
+    """Build the Azure OpenAI client once per endpoint/key and share it across reruns"""
+    return AzureOpenAI(azure_endpoint=endpoint, api_key=api_key, api_version=api_version)
+
+def _shutdown_client(client: AlgoliaMCPClient):
+    if client.session is None:   # already closed
+        return
+    try:
+        client.run_async(client.disconnect())
+    except Exception:
+        pass
+
+@st.cache_resource(show_spinner=False)
+def page_css() -> str:
+    """Read the page stylesheet once per server process"""
+    css = Path(__file__).with_name("styles.css").read_text(encoding="utf-8")
+    return f"<style>\n{css}</style>"
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_indices(_client: AlgoliaMCPClient, app_id: str) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """List an application's indices and their names, cached briefly per application"""
+    res = _client.run_async(_client.list_indices(app_id))
+    if not res.get("success"):
+        raise RuntimeError(res.get("error", "Unknown error"))   # raising keeps failures uncached
+    indices_data, indices_names = [], []
+    for item in res.get("content", []):
+        # Get the text content from the item
+        text_content = _text(item)
+        try:
+            items = orjson.loads(text_content).get("items", [])
+            indices_data.extend(items)
+            indices_names.extend(idx.get("name", "Unknown") for idx in items)
+        except (json.JSONDecodeError, TypeError, AttributeError):
+            # Fallback: if parsing fails, try the item directly
+            if isinstance(item, dict):
+                indices_data.append(item)
+                indices_names.append(item.get("name", "Unknown"))
+    return indices_data, indices_names
+
+def _parse_sample(sample_res: Dict[str, Any]) -> Dict[str, Any]:
+    """Collect the sample hits and total hit count from a search response"""
+    sample_records = []
+    search_data_info = {}
+    contents = sample_res.get("content", [])
+    if len(contents) == 1:
+        # The usual case: one JSON blob whose hits list can be used as-is
+        try:
+            search_data_info = orjson.loads(_text(contents[0]))
+            sample_records = search_data_info.get("hits", [])
+        except (json.JSONDecodeError, TypeError):
+            pass
+    else:
+        for content_item in contents:
+            try:
+                search_data = orjson.loads(_text(content_item))
+                sample_records.extend(search_data.get("hits", []))
+                search_data_info = search_data  # Store for total hits info
+            except (json.JSONDecodeError, TypeError):
+                continue
+    return {'records': sample_records, 'total_hits': search_data_info.get("nbHits", "Unknown")}
+
+@st.cache_data(ttl=60, show_spinner=False)
+def fetch_index_details(_client: AlgoliaMCPClient, app_id: str, index: str) -> Tuple[Tuple[Any, Optional[str]], ...]:
+    """Fetch an index's sample records and raw settings JSON together, as (value, error) pairs cached briefly per index"""
+    sample_res, settings_res = _client.run_async(_client.index_details(app_id, index))
+    if not sample_res.get("success") and not settings_res.get("success"):
+        raise RuntimeError(sample_res.get("error", "Unknown error"))   # nothing worth caching
+    sample = ((_parse_sample(sample_res), None) if sample_res.get("success")
+              else (None, sample_res.get("error", "Unknown error")))
+    settings = (([_text(item) for item in settings_res.get("content", [])], None) if settings_res.get("success")
+                else (None, settings_res.get("error", "Unknown error")))
+    return sample, settings
+
+_SAMPLE, _SETTINGS = 0, 1   # halves of fetch_index_details
+
+def index_detail(client: AlgoliaMCPClient, app_id: str, index: str, part: int) -> Any:
+    """Return one half of the cached index details, raising RuntimeError if that half failed"""
+    value, error = fetch_index_details(client, app_id, index)[part]
+    if error is not None:
+        fetch_index_details.clear(client, app_id, index)   # only this entry, so a retry refetches it
+        raise RuntimeError(error)
+    return value
+
+_MB = 1024 * 1024   # bytes per megabyte for the index size readouts
+
+# Built-in ranking criteria -> (icon, description); asc()/desc() and unknown rules fall back
+_RANK_META = {
+    "typo":      ("⌨️", "Typo tolerance"),
+    "geo":       ("📍", "Geographic distance"),
+    "words":     ("📝", "Word matching"),
+    "filters":   ("🔍", "Filter matching"),
+    "proximity": ("📐", "Word proximity"),
+    "attribute": ("🎯", "Attribute importance"),
+    "exact":     ("✅", "Exact matching"),
+    "custom":    ("⚙️", "Custom ranking"),
+}
+
+_CUSTOM_DIRECTION = {"desc": "📉 Descending", "asc": "📈 Ascending"}
+
+# Settings with their own tabs; everything else is shown under Advanced Settings
+_STRUCTURED_KEYS = frozenset({"searchableAttributes", "attributesToHighlight", "attributesToSnippet",
+                              "attributesForFaceting", "ranking", "customRanking"})
+_SEARCH_WORDS_RE = re.compile(r"typo|language|query|alternative|synonym", re.I)
+_PERF_WORDS_RE = re.compile(r"timeout|max|min|limit|numericattributes", re.I)
+
+def classify_settings(settings: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any], Dict[str, Any]]:
+    """Split index settings into search-behaviour, performance/limit and other groups"""
+    search, perf, other = {}, {}, {}
+    for key, value in settings.items():
+        if _SEARCH_WORDS_RE.search(key):
+            search[key] = value
+        elif _PERF_WORDS_RE.search(key):
+            perf[key] = value
+        else:
+            other[key] = value
+    return search, perf, other
+
+_BULKY_SETTING_LEN = 8
+_CONTAINERS = (list, dict)
+
+def _is_big(value: Any) -> bool:
+    """Cheap structural probe: a long list/dict, or a short one holding nested lists/dicts"""
+    kind = type(value)
+    if kind is not list and kind is not dict:
+        return False
+    if len(value) > _BULKY_SETTING_LEN:
+        return True
+    # At most _BULKY_SETTING_LEN items left to look at
+    return any(type(x) in _CONTAINERS for x in (value.values() if kind is dict else value))
+
+def render_setting(key: str, value: Any, flag_bools: bool = True):
+    """Render one advanced setting as a bullet, expanding bulky lists/dicts"""
+    kind = type(value)
+    if flag_bools and kind is bool:
+        st.markdown(f"  • **{key}**: {'✅' if value else '❌'}")
+    elif _is_big(value):
+        st.markdown(f"  • **{key}**: *{len(value) if kind is list else 'configured'}*")
+        with st.expander(f"View {key}", expanded=False):
+            st.json(_fastjson(value))
+    else:
+        st.markdown(f"  • **{key}**: `{value}`")
+
+_EM_RE = re.compile(r"&lt;em&gt;(.*?)&lt;/em&gt;", re.S)   # match tags after html.escape
+_EM_SUB = r'<span class="hit">\1</span>'
+_MATCH_MARKERS = {"full": "🟢", "partial": "🟡"}
+
+# Static copy for the Search tab's tips expander, one markdown element per block
+_SEARCH_TIPS_LEFT_MD = """\
+**📝 Text & Content Searches:**
+- `iPhone` - Find products containing 'iPhone'
+- `john smith` - Search for names or multi-word terms
+- `premium quality` - Find items with specific descriptions
+- `2024` - Search by year or numbers
+
+**🏷️ Category & Type Searches:**
+- `electronics` - Find items by category
+- `california` - Search by location
+- `manager` - Find by job title or role
+"""
+
+_SEARCH_TIPS_RIGHT_MD = """\
+**🔤 Advanced Search Patterns:**
+- `"exact phrase"` - Search for exact phrases
+- `apple OR orange` - Find either term
+- `laptop -gaming` - Exclude specific terms
+- `price:>100` - Numeric filtering (if configured)
+
+**📊 Common Use Cases:**
+- Product names, SKUs, or descriptions
+- Customer names, emails, or companies
+- Article titles, content, or tags
+- Locations, dates, or categories
+"""
+
+_SEARCH_TIPS_PRO_MD = """\
+---
+**⚡ Pro Tips:**
+- **Start simple**: Try single keywords first
+- **Use quotes**: For exact phrase matching
+- **Check spelling**: Algolia handles some typos but exact spelling works best
+- **Try variations**: Different words for the same concept
+- **Browse first**: Use the Indices tab to see what data is available
+- **Look for highlights**: Matching terms will be <span class='hit'>highlighted</span> in yellow
+"""
+
 def show_search_results(res: Dict[str, Any]):
     """Display search results with proper highlighting and better key-value alignment"""
     if not res.get("success"):
@@ -401,9 +772,11 @@ def show_search_results(res: Dict[str, Any]):
         return
     
     for content_item in res.get("content", []):
-        text_content = getattr(content_item, "text", None) or str(content_item)
+        text_content = _text(content_item)
         try:
-            search_data = json.loads(text_content)
+            search_data = orjson.loads(text_content)
+            if type(search_data) is not dict or type(search_data.get("hits", [])) is not list:
+                raise TypeError("unexpected search response shape")
             
             # Extract search metadata
             hits = search_data.get("hits", [])
@@ -436,56 +809,30 @@ def show_search_results(res: Dict[str, Any]):
                 st.info("💡 Try different keywords or check spelling")
                 return
             
-            # Display each hit
-            for i, hit in enumerate(hits, 1):
-                st.markdown(f"### 📄 **Result {i}**")
-                
-                with st.container():
-                    # Show objectID prominently
-                    object_id = hit.get("objectID", "Unknown")
-                    st.markdown(f"**🆔 Object ID:** `{object_id}`")
-                    
-                    # Display highlighted results if available
-                    highlight_result = hit.get("_highlightResult", {})
-                    
-                    if highlight_result:
-                        for field_name, highlight_data in highlight_result.items():
-                            if isinstance(highlight_data, dict) and "value" in highlight_data:
-                                highlighted_value = highlight_data.get("value", "")
-                                match_level = highlight_data.get("matchLevel", "none")
-                                
-                                # Create a more structured display with better alignment
-                                col1, col2, col3 = st.columns([1.5, 0.3, 3])
-                                
-                                with col1:
-                                    st.markdown(f"**{field_name}:**")
-                                
-                                with col2:
-                                    # Show match level with color coding
-                                    if match_level == "full":
-                                        st.markdown("🟢")
-                                    elif match_level == "partial":
-                                        st.markdown("🟡")
-                                    else:
-                                        st.markdown("⚪")
-                                
-                                with col3:
-                                    # Render highlighted text by converting <em> tags to styled HTML
-                                    if "<em>" in highlighted_value and "</em>" in highlighted_value:
-                                        # Convert <em> tags to highlighted HTML with background color
-                                        highlighted_html = highlighted_value.replace(
-                                            "<em>", 
-                                            '<span style="background-color: #ffeb3b; color: #000; padding: 2px 4px; border-radius: 3px; font-weight: bold;">'
-                                        ).replace("</em>", "</span>")
-                                        st.markdown(highlighted_html, unsafe_allow_html=True)
-                                    else:
-                                        st.markdown(highlighted_value)
-                        
-                        st.markdown("---")
+            # Build every hit into one HTML blob so the page is a single markdown element
+            # Only the objectID and highlight columns are rendered, so project them out once
+            object_ids = [html.escape(str(h.get("objectID", "Unknown"))) for h in hits]
+            highlights = [h.get("_highlightResult") or {} for h in hits]
+            parts = []
+            for i, (object_id, highlight_result) in enumerate(zip(object_ids, highlights), 1):
+                if i > 1:
+                    parts.append("<hr>")
+                parts.append(f"<h3>📄 <b>Result {i}</b></h3>"
+                             f"<p><b>🆔 Object ID:</b> <code>{object_id}</code></p>")
                 
-                # Add separator between results
-                if i < len(hits):
-                    st.markdown("---")
+                # Display highlighted results if available
+                for field_name, highlight_data in highlight_result.items():
+                    if isinstance(highlight_data, dict) and "value" in highlight_data:
+                        # Highlight values carry the record's raw text, so escape everything and then
+                        # restore only the <em> match tags; <br> keeps blank lines from ending the HTML block
+                        escaped_value = html.escape(str(highlight_data.get("value", "")))
+                        highlighted_html = "<br>".join(_EM_RE.sub(_EM_SUB, escaped_value).splitlines())
+                        marker = _MATCH_MARKERS.get(highlight_data.get("matchLevel", "none"), "⚪")
+                        parts.append(f"<div class='hit-field'><b>{html.escape(field_name)}:</b>"
+                                     f"<span>{marker}</span><div>{highlighted_html}</div></div>")
+            
+            st.markdown("".join(parts), unsafe_allow_html=True)
+            st.markdown("---")
             
             # Pagination info
             if nb_hits > hits_per_page:
@@ -494,8 +841,8 @@ def show_search_results(res: Dict[str, Any]):
         
         except (json.JSONDecodeError, TypeError) as e:
             st.error(f"❌ Error parsing search results: {e}")
-            # Fallback to original display
-            show(search_data)
+            # Fallback to the raw response text
+            st.code(text_content)
  
  
 ###############################################
@@ -514,7 +861,9 @@ def init_state():
         "client": None, "connected": False,
         "apps": [], "current_app": None,
         "app_data": {},  # Store mapping of app names to app IDs
-        "indices": []
+        "app_index": {},  # App name -> position in apps, for the selectbox
+        "indices": [],
+        "prefetched_user": None
     }
     for k, v in defaults.items():
         if k not in st.session_state:
@@ -530,37 +879,38 @@ with st.sidebar:
     if not st.session_state.connected:
         if st.button("🚀 Connect to MCP Server", type="primary"):
             with st.spinner("🔄 Establishing connection to MCP server..."):
-                st.session_state.client = AlgoliaMCPClient()
-                if st.session_state.client.run_async(st.session_state.client.connect()):
+                try:
+                    st.session_state.client = get_mcp_client(os.getenv("ALGOLIA_APP_ID"),
+                                                             os.getenv("ALGOLIA_API_KEY"))
+                except RuntimeError:
+                    st.session_state.client = None   # missing credentials or server failed to start
+                if st.session_state.client:
                     st.session_state.connected = True
-                    # fetch apps immediately
-                    raw = st.session_state.client.run_async(st.session_state.client.get_apps())
-                    apps = []
-                    app_data = {}
+                    # fetch apps immediately, prefetching user info in the same round-trip
+                    raw, user = st.session_state.client.run_async(st.session_state.client.bootstrap())
+                    st.session_state.prefetched_user = user
+                    app_data = {}   # app name -> app ID, in listing order
                     
                     for item in raw.get("content", []):
                         # Get the text content from the item
-                        text_content = getattr(item, "text", None) or str(item)
+                        text_content = _text(item)
                         
                         try:
                             # Parse the JSON to extract app info
-                            app_json = json.loads(text_content)
-                            app_list = app_json.get("data", [])
-                            
-                            for app_info in app_list:
+                            for app_info in orjson.loads(text_content).get("data", []):
                                 app_id = app_info.get("id")
                                 app_name = app_info.get("attributes", {}).get("name", f"App {app_id}")
-                                
                                 if app_name and app_id:
-                                    apps.append(app_name)
                                     app_data[app_name] = app_id
-                                    
                         except (json.JSONDecodeError, TypeError, AttributeError):
-                            # Fallback: if parsing fails, use the raw content
-                            apps.append(str(text_content)[:50] + "..." if len(str(text_content)) > 50 else str(text_content))
+                            # Fallback: if parsing fails, list the raw content without an ID
+                            text = str(text_content)
+                            app_data[text[:50] + "..." if len(text) > 50 else text] = None
                     
+                    apps = list(app_data)
                     st.session_state.apps = apps
                     st.session_state.app_data = app_data
+                    st.session_state.app_index = {name: i for i, name in enumerate(apps)}
                     st.session_state.current_app = apps[0] if apps else None
                     
                     # Success message with more details
@@ -576,15 +926,10 @@ with st.sidebar:
         st.caption("Ready to interact with Algolia APIs")
         if st.button("🔌 Disconnect from MCP Server"):
             with st.spinner("🔄 Disconnecting from MCP server..."):
-                try:
-                    # Attempt graceful disconnect
-                    st.session_state.client.run_async(st.session_state.client.disconnect())
-                except Exception as e:
-                    # If disconnect fails, still proceed with cleanup
-                    st.warning(f"Disconnect warning: {str(e)[:100]}... (connection cleaned up)")
-                
-                # Reset session state regardless of disconnect success
-                for k in ["connected", "client", "apps", "current_app", "app_data", "indices"]:
+                # The server is shared by every session using these credentials (see
+                # get_mcp_client), so only drop this session's reference; it is shut
+                # down at process exit
+                for k in ["connected", "client", "apps", "current_app", "app_data", "app_index", "indices", "prefetched_user"]:
                     st.session_state[k] = init_state()[k]
                 
                 st.success("🔌 Successfully disconnected from MCP Server")
@@ -597,7 +942,7 @@ with st.sidebar:
         selected_app = st.selectbox(
             "Choose your Algolia application:",
             st.session_state.apps,
-                     index=st.session_state.apps.index(st.session_state.current_app or st.session_state.apps[0]),
+            index=st.session_state.app_index.get(st.session_state.current_app, 0),
             key="current_app",
             help="Select which Algolia application you want to work with"
         )
@@ -611,7 +956,8 @@ def show(res: Dict[str, Any]):
             txt = getattr(c, "text", None)
             if txt:
                 try:
-                    st.json(json.loads(txt))
+                    orjson.loads(txt)   # valid JSON goes to st.json as-is, no re-encode
+                    st.json(txt)
                 except Exception:
                     st.write(txt)
             else:
@@ -647,43 +993,8 @@ if not app_id:
 # ----------------- TABS ---------------------- #
 #################################################
  
-# Custom CSS to make tabs bigger
-st.markdown("""
-<style>
-    .stTabs [data-baseweb="tab-list"] {
-        gap: 8px;
-    }
-    
-    .stTabs [data-baseweb="tab"] {
-        height: 60px;
-        padding-left: 20px;
-        padding-right: 20px;
-        background-color: rgba(255, 255, 255, 0.05);
-        border-radius: 8px;
-        color: #FAFAFA;
-        font-size: 20px;
-        font-weight: 500;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        transition: all 0.3s ease;
-    }
-    
-    .stTabs [aria-selected="true"] {
-        background-color: rgba(255, 75, 75, 0.2);
-        color: #FF4B4B;
-        font-size: 20px;
-        font-weight: 600;
-        border: 1px solid rgba(255, 75, 75, 0.3);
-    }
-    
-    .stTabs [data-baseweb="tab"]:hover {
-        background-color: rgba(255, 255, 255, 0.1);
-        transform: translateY(-2px);
-        box-shadow: 0 4px 8px rgba(0, 0, 0, 0.2);
-    }
-</style>
-""", unsafe_allow_html=True)
+# Custom CSS to make tabs bigger (and lay out search hits)
+st.markdown(page_css(), unsafe_allow_html=True)
 
 tab1, tab2, tab3, tab6, tab7 = st.tabs(
     ["👤 User & Apps", "📊 Indices", "🔍 Search", "📤 Upload Data", "🤖 AI Chat"]
@@ -692,24 +1003,25 @@ tab1, tab2, tab3, tab6, tab7 = st.tabs(
 with tab1:
     st.subheader("Account")
     if st.button("Get user info"):
-        # Add timing for get user info
-        import time
-        start_time = time.time()
-        
-        result = st.session_state.client.run_async(st.session_state.client.get_user())
-        
-        end_time = time.time()
-        duration = end_time - start_time
-        time_str = f"{duration*1000:.0f} milliseconds" if duration < 1 else f"{duration:.2f} seconds"
+        # The first click reuses the user info prefetched at connect time, unless that call failed
+        prefetched = st.session_state.pop("prefetched_user", None)
+        if prefetched and prefetched.get("success"):
+            result = prefetched
+            retrieved = "at connect time (prefetched)"
+        else:
+            # Add timing for get user info
+            start_time = perf_counter()
+            result = st.session_state.client.run_async(st.session_state.client.get_user())
+            retrieved = f"in {_fmt_dur(perf_counter() - start_time)}"
         
         # Display user info in an attractive format
         if result.get("success"):
             # Extract user data from the result
             user_data = None
             for content_item in result.get("content", []):
-                text_content = getattr(content_item, "text", None) or str(content_item)
+                text_content = _text(content_item)
                 try:
-                    user_json = json.loads(text_content)
+                    user_json = orjson.loads(text_content)
                     
                     # Handle different response formats
                     if isinstance(user_json, dict):
@@ -775,22 +1087,16 @@ with tab1:
                         # Last updated
                         updated_at = attributes.get("updated_at", "")
                         if updated_at:
-                            try:
-                                from datetime import datetime
-                                updated_dt = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
-                                formatted_date = updated_dt.strftime('%B %d, %Y at %H:%M UTC')
-                                st.markdown(f"**🔄 Last Updated:** {formatted_date}")
-                            except:
-                                st.markdown(f"**🔄 Last Updated:** {updated_at}")
+                            st.markdown(f"**🔄 Last Updated:** {_fmt_iso(updated_at, '%B %d, %Y at %H:%M UTC')}")
                         
                         # API call timing
-                        st.markdown(f"**⚡ Retrieved in:** {time_str}")
+                        st.markdown(f"**⚡ Retrieved:** {retrieved}")
                 
             else:
                 st.error("❌ Could not parse user information")
-                st.json(result)  # Fallback to raw display
+                st.json(_fastjson(result))  # Fallback to raw display
             
-            st.toast(f"👤 User info retrieved in {time_str}!", icon="👋")
+            st.toast(f"👤 User info retrieved {retrieved}!", icon="👋")
         
         else:
             st.error("❌ Failed to retrieve user information")
@@ -803,7 +1109,7 @@ with tab1:
         if st.session_state.apps:
             st.write("Available applications:")
             for app_name in st.session_state.apps:
-                app_id_display = st.session_state.app_data.get(app_name, "N/A")
+                app_id_display = st.session_state.app_data.get(app_name) or "N/A"
                 st.write(f"• **{app_name}** (ID: `{app_id_display}`)")
         else:
             st.write("No applications found")
@@ -816,6 +1122,8 @@ with tab2:
         st.session_state.indices_data = []
     if 'indices_names' not in st.session_state:
         st.session_state.indices_names = []
+    if 'indices_by_name' not in st.session_state:
+        st.session_state.indices_by_name = {}
     
     # Load Indices Section
     col1, col2 = st.columns([2, 1])
@@ -824,46 +1132,35 @@ with tab2:
         if st.button("🔄 Load All Indices", type="primary"):
             with st.spinner("Loading indices..."):
                 # Add timing for list indices
-                import time
-                start_time = time.time()
+                start_time = perf_counter()
                 
-                res = st.session_state.client.run_async(st.session_state.client.list_indices(app_id))
+                try:
+                    indices_data, indices_names = fetch_indices(st.session_state.client, app_id)
+                except RuntimeError as e:
+                    indices_data = None
+                    load_error = str(e)
                 
-                end_time = time.time()
-                duration = end_time - start_time
-                time_str = f"{duration*1000:.0f} milliseconds" if duration < 1 else f"{duration:.2f} seconds"
+                time_str = _fmt_dur(perf_counter() - start_time)
                 
-                if res.get("success"):
-                    # Parse indices data
-                    indices_raw = res.get("content", [])
-                    indices_data = []
-                    
-                    for item in indices_raw:
-                        # Get the text content from the item
-                        text_content = getattr(item, "text", None) or str(item)
-                        
-                        try:
-                            # Parse the JSON to extract indices info
-                            indices_json = json.loads(text_content)
-                            indices_list = indices_json.get("items", [])
-                            indices_data.extend(indices_list)
-                        except (json.JSONDecodeError, TypeError, AttributeError):
-                            # Fallback: if parsing fails, try the item directly
-                            if isinstance(item, dict):
-                                indices_data.append(item)
-                    
+                if indices_data is not None:
                     st.session_state.indices_data = indices_data
-                    st.session_state.indices_names = [idx.get("name", "Unknown") for idx in indices_data]
+                    st.session_state.indices_names = indices_names
+                    st.session_state.indices_by_name = dict(zip(indices_names, indices_data))
                     
                     st.toast(f"📋 {len(indices_data)} indices loaded in {time_str}!", icon="📂")
                     st.success(f"✅ Found {len(indices_data)} indices in your application")
                 else:
                     st.error("❌ Failed to load indices")
-                    st.error(res.get("error", "Unknown error"))
+                    st.error(load_error)
     
     with col2:
         if st.session_state.indices_data:
             st.metric("Total Indices", len(st.session_state.indices_data))
+        if st.button("🗑️ Clear cache", key="clear_index_cache",
+                     help="Forget cached index lists, sample records and settings"):
+            fetch_indices.clear()
+            fetch_index_details.clear()
+            st.toast("🗑️ Index cache cleared", icon="✨")
     
     # Display Indices Section
     if st.session_state.indices_data:
@@ -873,53 +1170,23 @@ with tab2:
         # Create a tabular view of all indices
         st.markdown("### 📊 All Indices Overview")
         
-        # Prepare data for the table
-        table_data = []
-        for idx in st.session_state.indices_data:
-            # Calculate sizes in MB
-            data_size_mb = idx.get("dataSize", 0) / (1024 * 1024) if idx.get("dataSize", 0) > 0 else 0
-            file_size_mb = idx.get("fileSize", 0) / (1024 * 1024) if idx.get("fileSize", 0) > 0 else 0
-            
-            # Format timestamps
-            created_at = idx.get("createdAt", "")
-            updated_at = idx.get("updatedAt", "")
-            
-            try:
-                from datetime import datetime
-                if created_at:
-                    created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                    created_formatted = created_dt.strftime('%Y-%m-%d %H:%M')
-                else:
-                    created_formatted = "Unknown"
-                    
-                if updated_at:
-                    updated_dt = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
-                    updated_formatted = updated_dt.strftime('%Y-%m-%d %H:%M')
-                else:
-                    updated_formatted = "Unknown"
-            except:
-                created_formatted = created_at[:16] if created_at else "Unknown"
-                updated_formatted = updated_at[:16] if updated_at else "Unknown"
-            
-            # Status
-            pending_task = idx.get("pendingTask", False)
-            status = "🟡 Processing" if pending_task else "🟢 Ready"
-            
-            table_data.append({
-                "Index Name": idx.get("name", "Unknown"),
-                "Records": f"{idx.get('entries', 0):,}",
-                "Data Size": f"{data_size_mb:.2f} MB",
-                "File Size": f"{file_size_mb:.2f} MB",
-                "Status": status,
-                "Created": created_formatted,
-                "Updated": updated_formatted,
-                "Pending Tasks": idx.get("numberOfPendingTasks", 0)
-            })
+        # Prepare data for the table, one vectorised operation per column
+        idx_df = pd.DataFrame(st.session_state.indices_data).reindex(columns=[
+            "name", "entries", "dataSize", "fileSize", "pendingTask",
+            "createdAt", "updatedAt", "numberOfPendingTasks"])
         
         # Display the table
-        if table_data:
-            import pandas as pd
-            df = pd.DataFrame(table_data)
+        if not idx_df.empty:
+            df = pd.DataFrame({
+                "Index Name": idx_df["name"].fillna("Unknown"),
+                "Records": idx_df["entries"].fillna(0).astype(int).map("{:,}".format),
+                "Data Size": (idx_df["dataSize"].fillna(0).clip(lower=0) / _MB).map("{:.2f} MB".format),
+                "File Size": (idx_df["fileSize"].fillna(0).clip(lower=0) / _MB).map("{:.2f} MB".format),
+                "Status": idx_df["pendingTask"].eq(True).map({True: "🟡 Processing", False: "🟢 Ready"}),
+                "Created": _fmt_iso_column(idx_df["createdAt"]),
+                "Updated": _fmt_iso_column(idx_df["updatedAt"]),
+                "Pending Tasks": idx_df["numberOfPendingTasks"].fillna(0).astype(int),
+            })
             
             # Display with custom styling
             st.dataframe(
@@ -942,10 +1209,11 @@ with tab2:
             st.markdown("### 📈 Summary Statistics")
             col1, col2, col3, col4 = st.columns(4)
             
-            total_records = sum(idx.get("entries", 0) for idx in st.session_state.indices_data)
-            total_data_size = sum(idx.get("dataSize", 0) for idx in st.session_state.indices_data) / (1024 * 1024)
-            total_file_size = sum(idx.get("fileSize", 0) for idx in st.session_state.indices_data) / (1024 * 1024)
-            processing_indices = sum(1 for idx in st.session_state.indices_data if idx.get("pendingTask", False))
+            totals = idx_df[["entries", "dataSize", "fileSize"]].sum()   # NaN-skipping column sums
+            total_records = int(totals["entries"])
+            total_data_size = totals["dataSize"] / _MB
+            total_file_size = totals["fileSize"] / _MB
+            processing_indices = int(idx_df["pendingTask"].eq(True).sum())
             
             with col1:
                 st.metric("🗂️ Total Indices", len(st.session_state.indices_data))
@@ -982,11 +1250,7 @@ with tab2:
             # Show details automatically when an index is selected
             if selected_index_name:
                 # Find the selected index data
-                selected_index = None
-                for idx in st.session_state.indices_data:
-                    if idx.get("name") == selected_index_name:
-                        selected_index = idx
-                        break
+                selected_index = st.session_state.indices_by_name.get(selected_index_name)
                 
                 if selected_index:
                     # Display index information in a user-friendly way
@@ -1001,12 +1265,12 @@ with tab2:
                     
                     with col2:
                         data_size = selected_index.get("dataSize", 0)
-                        size_mb = data_size / (1024 * 1024) if data_size > 0 else 0
+                        size_mb = data_size / _MB if data_size > 0 else 0
                         st.metric("💾 Data Size", f"{size_mb:.2f} MB")
                     
                     with col3:
                         file_size = selected_index.get("fileSize", 0)
-                        file_mb = file_size / (1024 * 1024) if file_size > 0 else 0
+                        file_mb = file_size / _MB if file_size > 0 else 0
                         st.metric("📁 File Size", f"{file_mb:.2f} MB")
                     
                     with col4:
@@ -1022,20 +1286,10 @@ with tab2:
                         updated_at = selected_index.get("updatedAt", "Unknown")
                         
                         if created_at != "Unknown":
-                            try:
-                                from datetime import datetime
-                                created_dt = datetime.fromisoformat(created_at.replace('Z', '+00:00'))
-                                st.write(f"**Created:** {created_dt.strftime('%Y-%m-%d %H:%M:%S UTC')}")
-                            except:
-                                st.write(f"**Created:** {created_at}")
+                            st.write(f"**Created:** {_fmt_iso(created_at, '%Y-%m-%d %H:%M:%S UTC')}")
                         
                         if updated_at != "Unknown":
-                            try:
-                                from datetime import datetime
-                                updated_dt = datetime.fromisoformat(updated_at.replace('Z', '+00:00'))
-                                st.write(f"**Updated:** {updated_dt.strftime('%Y-%m-%d %H:%M:%S UTC')}")
-                            except:
-                                st.write(f"**Updated:** {updated_at}")
+                            st.write(f"**Updated:** {_fmt_iso(updated_at, '%Y-%m-%d %H:%M:%S UTC')}")
                     
                     with col2:
                         st.markdown("**⚙️ Status:**")
@@ -1062,35 +1316,22 @@ with tab2:
                     if st.button(f"🔍 Load Sample Data", key="load_sample_btn"):
                         with st.spinner(f"Loading sample data from {selected_index_name}..."):
                             # Add timing for sample data loading
-                            import time
-                            start_time = time.time()
+                            start_time = perf_counter()
                             
                             # Fetch sample records using search with empty query
-                            sample_result = st.session_state.client.run_async(
-                                st.session_state.client.search(app_id, selected_index_name, "", 2, 0))
+                            try:
+                                sample = index_detail(st.session_state.client, app_id, selected_index_name, _SAMPLE)
+                            except RuntimeError as e:
+                                sample, sample_error = None, str(e)
                             
-                            end_time = time.time()
-                            duration = end_time - start_time
-                            time_str = f"{duration*1000:.0f} milliseconds" if duration < 1 else f"{duration:.2f} seconds"
+                            time_str = _fmt_dur(perf_counter() - start_time)
                             
-                            if sample_result.get("success"):
-                                # Parse the sample data
-                                sample_records = []
-                                search_data_info = {}
-                                for content_item in sample_result.get("content", []):
-                                    text_content = getattr(content_item, "text", None) or str(content_item)
-                                    try:
-                                        search_data = json.loads(text_content)
-                                        hits = search_data.get("hits", [])
-                                        sample_records.extend(hits)
-                                        search_data_info = search_data  # Store for total hits info
-                                    except (json.JSONDecodeError, TypeError):
-                                        continue
+                            if sample is not None:
+                                sample_records = sample['records']
                                 
                                 # Store sample data in session state
                                 st.session_state[f'sample_data_{selected_index_name}'] = {
-                                    'records': sample_records,
-                                    'total_hits': search_data_info.get("nbHits", "Unknown"),
+                                    **sample,
                                     'load_time': time_str
                                 }
                                 
@@ -1102,7 +1343,7 @@ with tab2:
                                     st.info("The index might be empty or all records might be filtered out")
                             else:
                                 st.error("❌ Failed to load sample data")
-                                st.error(sample_result.get("error", "Unknown error"))
+                                st.error(sample_error)
                 
                 # Display sample records outside of columns for proper centering
                 sample_data = st.session_state.get(f'sample_data_{selected_index_name}')
@@ -1116,24 +1357,22 @@ with tab2:
                         
                         # Create expandable view for each record
                         with st.expander(f"View Record {i} Details", expanded=i==1):
-                            # Remove Algolia metadata for cleaner display
-                            clean_record = {k: v for k, v in record.items() 
-                                          if not k.startswith('_') and k != 'objectID'}
+                            # Remove Algolia metadata for cleaner display, stopping at the 8 fields shown
+                            shown_fields = _clean_items(record)
                             
-                            if clean_record:
+                            if shown_fields:
                                 # Display key-value pairs in a nice format
                                 col1, col2 = st.columns([1, 2])
                                 
-                                for key, value in list(clean_record.items())[:8]:  # Show first 8 fields
+                                for key, value in shown_fields:  # Show first 8 fields
                                     with col1:
                                         st.markdown(f"**{key}:**")
                                     with col2:
-                                        if isinstance(value, str) and len(value) > 100:
-                                            st.markdown(f"`{value[:100]}...`")
-                                        elif isinstance(value, (list, dict)):
-                                            st.json(value)
+                                        md, js = _render_field(value)
+                                        if js is not None:
+                                            st.json(_fastjson(js))
                                         else:
-                                            st.markdown(f"`{value}`")
+                                            st.markdown(md)
                                 
                                 # Show total field count
                                 total_fields = len(record)
@@ -1148,10 +1387,10 @@ with tab2:
                                 
                                 # Raw record expandable
                                 with st.expander("🔍 Raw Record Data", expanded=False):
-                                    st.json(record)
+                                    st.json(_fastjson(record))
                             else:
                                 st.info("📄 Record contains only metadata")
-                                st.json(record)
+                                st.json(_fastjson(record))
                         
                         if i < len(sample_data['records']):
                             st.markdown("---")
@@ -1175,25 +1414,24 @@ with tab2:
                 if st.button(f"⚙️ Get Settings for '{selected_index_name}'", key="get_settings_btn"):
                     with st.spinner(f"Loading settings for {selected_index_name}..."):
                         # Add timing for get settings
-                        import time
-                        start_time = time.time()
+                        start_time = perf_counter()
                         
-                        result = st.session_state.client.run_async(st.session_state.client.get_settings(app_id, selected_index_name))
+                        try:
+                            settings_texts = index_detail(st.session_state.client, app_id, selected_index_name, _SETTINGS)
+                        except RuntimeError as e:
+                            settings_texts, settings_error = None, str(e)
                         
-                        end_time = time.time()
-                        duration = end_time - start_time
-                        time_str = f"{duration*1000:.0f} milliseconds" if duration < 1 else f"{duration:.2f} seconds"
+                        time_str = _fmt_dur(perf_counter() - start_time)
                         
-                        if result.get("success"):
+                        if settings_texts is not None:
                             st.toast(f"⚙️ Settings retrieved in {time_str}!", icon="🔧")
                             
                             # Display settings in a more readable format
                             st.subheader(f"⚙️ Settings for {selected_index_name}")
                             
-                            for content_item in result.get("content", []):
-                                text_content = getattr(content_item, "text", None) or str(content_item)
+                            for text_content in settings_texts:
                                 try:
-                                    settings_data = json.loads(text_content)
+                                    settings_data = orjson.loads(text_content)
                                     
                                     # Display key settings in tabs
                                     setting_tab1, setting_tab2, setting_tab3 = st.tabs(["🔍 Search", "📊 Attributes", "🛠️ Advanced"])
@@ -1205,8 +1443,7 @@ with tab2:
                                         searchable_attrs = settings_data.get("searchableAttributes", [])
                                         st.markdown("**🎯 Searchable Attributes:**")
                                         if searchable_attrs:
-                                            for i, attr in enumerate(searchable_attrs, 1):
-                                                st.markdown(f"  **{i}.** `{attr}`")
+                                            st.markdown("\n\n".join(f"  **{i}.** `{attr}`" for i, attr in enumerate(searchable_attrs, 1)))
                                         else:
                                             st.info("📝 All attributes are searchable (default behavior)")
                                         
@@ -1216,9 +1453,7 @@ with tab2:
                                         highlight_attrs = settings_data.get("attributesToHighlight", [])
                                         st.markdown("**✨ Attributes to Highlight:**")
                                         if highlight_attrs and highlight_attrs != [None]:
-                                            for attr in highlight_attrs:
-                                                if attr:
-                                                    st.markdown(f"  • `{attr}`")
+                                            st.markdown("\n\n".join(f"  • `{attr}`" for attr in highlight_attrs if attr))
                                         else:
                                             st.info("🔍 No specific highlighting configured")
                                         
@@ -1228,9 +1463,7 @@ with tab2:
                                         snippet_attrs = settings_data.get("attributesToSnippet", [])
                                         st.markdown("**📄 Attributes to Snippet:**")
                                         if snippet_attrs and snippet_attrs != [None]:
-                                            for attr in snippet_attrs:
-                                                if attr:
-                                                    st.markdown(f"  • `{attr}`")
+                                            st.markdown("\n\n".join(f"  • `{attr}`" for attr in snippet_attrs if attr))
                                         else:
                                             st.info("📋 No snippet configuration")
                                     
@@ -1241,8 +1474,7 @@ with tab2:
                                         faceting_attrs = settings_data.get("attributesForFaceting", [])
                                         st.markdown("**🏷️ Faceting Attributes:**")
                                         if faceting_attrs:
-                                            for attr in faceting_attrs:
-                                                st.markdown(f"  • `{attr}`")
+                                            st.markdown("\n\n".join(f"  • `{attr}`" for attr in faceting_attrs))
                                         else:
                                             st.info("🔍 No faceting attributes configured")
                                         
@@ -1252,36 +1484,11 @@ with tab2:
                                         ranking = settings_data.get("ranking", [])
                                         st.markdown("**🎯 Ranking Formula:**")
                                         if ranking:
+                                            rank_lines = []
                                             for i, rank_rule in enumerate(ranking, 1):
-                                                if rank_rule.startswith("typo"):
-                                                    icon = "⌨️"
-                                                    desc = "Typo tolerance"
-                                                elif rank_rule.startswith("geo"):
-                                                    icon = "📍"
-                                                    desc = "Geographic distance"
-                                                elif rank_rule.startswith("words"):
-                                                    icon = "📝"
-                                                    desc = "Word matching"
-                                                elif rank_rule.startswith("filters"):
-                                                    icon = "🔍"
-                                                    desc = "Filter matching"
-                                                elif rank_rule.startswith("proximity"):
-                                                    icon = "📐"
-                                                    desc = "Word proximity"
-                                                elif rank_rule.startswith("attribute"):
-                                                    icon = "🎯"
-                                                    desc = "Attribute importance"
-                                                elif rank_rule.startswith("exact"):
-                                                    icon = "✅"
-                                                    desc = "Exact matching"
-                                                elif rank_rule.startswith("custom"):
-                                                    icon = "⚙️"
-                                                    desc = "Custom ranking"
-                                                else:
-                                                    icon = "📊"
-                                                    desc = "Ranking rule"
-                                                
-                                                st.markdown(f"  **{i}.** {icon} **{rank_rule}** - *{desc}*")
+                                                icon, desc = _RANK_META.get(rank_rule.split("(", 1)[0], ("📊", "Ranking rule"))
+                                                rank_lines.append(f"  **{i}.** {icon} **{rank_rule}** - *{desc}*")
+                                            st.markdown("\n\n".join(rank_lines))
                                         else:
                                             st.info("📈 Using default ranking formula")
                                         
@@ -1291,18 +1498,17 @@ with tab2:
                                         custom_ranking = settings_data.get("customRanking", [])
                                         st.markdown("**⚙️ Custom Ranking Attributes:**")
                                         if custom_ranking:
+                                            custom_lines = []
                                             for i, custom_rule in enumerate(custom_ranking, 1):
-                                                if custom_rule.startswith("desc("):
-                                                    direction = "📉 Descending"
-                                                    attr = custom_rule[5:-1]  # Remove desc( and )
-                                                elif custom_rule.startswith("asc("):
-                                                    direction = "📈 Ascending"
-                                                    attr = custom_rule[4:-1]  # Remove asc( and )
+                                                func, paren, inner = custom_rule.partition("(")
+                                                direction = _CUSTOM_DIRECTION.get(func) if paren else None
+                                                if direction:
+                                                    attr = inner[:-1]  # Remove the closing )
                                                 else:
-                                                    direction = "📊"
-                                                    attr = custom_rule
+                                                    direction, attr = "📊", custom_rule
                                                 
-                                                st.markdown(f"  **{i}.** {direction} `{attr}`")
+                                                custom_lines.append(f"  **{i}.** {direction} `{attr}`")
+                                            st.markdown("\n\n".join(custom_lines))
                                         else:
                                             st.info("🎯 No custom ranking configured")
                                     
@@ -1311,68 +1517,35 @@ with tab2:
                                         
                                         # Show all other settings in a nice format
                                         advanced_settings = {k: v for k, v in settings_data.items() 
-                                                           if k not in ["searchableAttributes", "attributesToHighlight", 
-                                                                       "attributesToSnippet", "attributesForFaceting", 
-                                                                       "ranking", "customRanking"]}
+                                                           if k not in _STRUCTURED_KEYS}
                                         
                                         if advanced_settings:
                                             # Group settings by type
-                                            search_settings = {}
-                                            performance_settings = {}
-                                            other_settings = {}
-                                            
-                                            for key, value in advanced_settings.items():
-                                                if any(word in key.lower() for word in ['typo', 'language', 'query', 'alternative', 'synonym']):
-                                                    search_settings[key] = value
-                                                elif any(word in key.lower() for word in ['timeout', 'max', 'min', 'limit', 'numericattributes']):
-                                                    performance_settings[key] = value
-                                                else:
-                                                    other_settings[key] = value
+                                            search_settings, performance_settings, other_settings = classify_settings(advanced_settings)
                                             
                                             # Display search-related settings
                                             if search_settings:
                                                 st.markdown("**🔍 Search Behavior:**")
                                                 for key, value in search_settings.items():
-                                                    if isinstance(value, bool):
-                                                        icon = "✅" if value else "❌"
-                                                        st.markdown(f"  • **{key}**: {icon}")
-                                                    elif isinstance(value, (list, dict)) and len(str(value)) > 50:
-                                                        st.markdown(f"  • **{key}**: *{len(value) if isinstance(value, list) else 'configured'}*")
-                                                        with st.expander(f"View {key}", expanded=False):
-                                                            st.json(value)
-                                                    else:
-                                                        st.markdown(f"  • **{key}**: `{value}`")
+                                                    render_setting(key, value)
                                                 st.markdown("---")
                                             
                                             # Display performance settings
                                             if performance_settings:
                                                 st.markdown("**⚡ Performance & Limits:**")
                                                 for key, value in performance_settings.items():
-                                                    if isinstance(value, (list, dict)) and len(str(value)) > 50:
-                                                        st.markdown(f"  • **{key}**: *{len(value) if isinstance(value, list) else 'configured'}*")
-                                                        with st.expander(f"View {key}", expanded=False):
-                                                            st.json(value)
-                                                    else:
-                                                        st.markdown(f"  • **{key}**: `{value}`")
+                                                    render_setting(key, value, flag_bools=False)
                                                 st.markdown("---")
                                             
                                             # Display other settings
                                             if other_settings:
                                                 st.markdown("**🔧 Other Settings:**")
                                                 for key, value in other_settings.items():
-                                                    if isinstance(value, bool):
-                                                        icon = "✅" if value else "❌"
-                                                        st.markdown(f"  • **{key}**: {icon}")
-                                                    elif isinstance(value, (list, dict)) and len(str(value)) > 50:
-                                                        st.markdown(f"  • **{key}**: *{len(value) if isinstance(value, list) else 'configured'}*")
-                                                        with st.expander(f"View {key}", expanded=False):
-                                                            st.json(value)
-                                                    else:
-                                                        st.markdown(f"  • **{key}**: `{value}`")
+                                                    render_setting(key, value)
                                             
                                             # Raw data expandable section for power users
                                             with st.expander("🔍 Raw Settings Data", expanded=False):
-                                                st.json(advanced_settings)
+                                                st.json(_fastjson(advanced_settings))
                                         else:
                                             st.info("📋 No additional advanced settings configured")
                                             
@@ -1381,7 +1554,7 @@ with tab2:
                                     st.write(text_content)
                         else:
                             st.error(f"❌ Failed to get settings for {selected_index_name}")
-                            st.error(result.get("error", "Unknown error"))
+                            st.error(settings_error)
     
     else:
         st.info("👆 Click 'Load All Indices' to view your indices")
@@ -1402,28 +1575,15 @@ with tab3:
         with col_refresh:
             if st.button("📋 Load Indices", key="search_load_indices"):
                 with st.spinner("Loading indices..."):
-                    res = st.session_state.client.run_async(st.session_state.client.list_indices(app_id))
-                    
-                    if res.get("success"):
-                        indices_raw = res.get("content", [])
-                        indices_names = []
-                        
-                        for item in indices_raw:
-                            text_content = getattr(item, "text", None) or str(item)
-                            try:
-                                indices_json = json.loads(text_content)
-                                indices_list = indices_json.get("items", [])
-                                for idx_item in indices_list:
-                                    indices_names.append(idx_item.get("name", "Unknown"))
-                            except (json.JSONDecodeError, TypeError, AttributeError):
-                                continue
-                        
+                    try:
+                        _, indices_names = fetch_indices(st.session_state.client, app_id)
+                    except RuntimeError as e:
+                        st.error("❌ Failed to load indices")
+                        st.error(str(e))
+                    else:
                         st.session_state.indices_names = indices_names
                         st.toast(f"📋 Found {len(indices_names)} indices!", icon="📂")
                         st.rerun()
-                    else:
-                        st.error("❌ Failed to load indices")
-                        st.error(res.get("error", "Unknown error"))
     
     # Search input fields
     col1, col2 = st.columns(2)
@@ -1431,7 +1591,7 @@ with tab3:
         # Index dropdown or text input fallback
         if st.session_state.indices_names:
             # Add refresh button next to dropdown
-            col_dropdown, col_refresh = st.columns([4, 1])
+            col_dropdown, col_refresh = st.columns([4, 1], vertical_alignment="bottom")
             with col_dropdown:
                 idx = st.selectbox(
                     "Select Index", 
@@ -1440,24 +1600,14 @@ with tab3:
                     help="Choose from your available indices"
                 )
             with col_refresh:
-                st.write("")  # Add spacing
                 if st.button("🔄", key="refresh_indices", help="Refresh index list"):
                     with st.spinner("Refreshing..."):
-                        res = st.session_state.client.run_async(st.session_state.client.list_indices(app_id))
-                        if res.get("success"):
-                            indices_raw = res.get("content", [])
-                            indices_names = []
-                            
-                            for item in indices_raw:
-                                text_content = getattr(item, "text", None) or str(item)
-                                try:
-                                    indices_json = json.loads(text_content)
-                                    indices_list = indices_json.get("items", [])
-                                    for idx_item in indices_list:
-                                        indices_names.append(idx_item.get("name", "Unknown"))
-                                except (json.JSONDecodeError, TypeError, AttributeError):
-                                    continue
-                            
+                        fetch_indices.clear()   # explicit refresh bypasses the short cache
+                        try:
+                            _, indices_names = fetch_indices(st.session_state.client, app_id)
+                        except RuntimeError as e:
+                            st.error(f"❌ Failed to refresh indices: {e}")
+                        else:
                             st.session_state.indices_names = indices_names
                             st.toast(f"🔄 Refreshed! Found {len(indices_names)} indices", icon="✅")
                             st.rerun()
@@ -1493,22 +1643,14 @@ with tab3:
             st.warning("⚠️ Please enter a search query")
         else:
             # Add timing for search operation
-            import time
-            search_start_time = time.time()
+            search_start_time = perf_counter()
             
             # Perform search
             search_result = st.session_state.client.run_async(
                 st.session_state.client.search(app_id, idx, q, hits, page))
             
             # Calculate search time
-            search_end_time = time.time()
-            search_duration = search_end_time - search_start_time
-            
-            # Format time nicely
-            if search_duration < 1:
-                search_time_str = f"{search_duration*1000:.0f} milliseconds"
-            else:
-                search_time_str = f"{search_duration:.2f} seconds"
+            search_time_str = _fmt_dur(perf_counter() - search_start_time)
             
             # Show search results
             show_search_results(search_result)
@@ -1522,55 +1664,16 @@ with tab3:
         st.markdown("### 🎯 **What can you search for?**")
         
         col1, col2 = st.columns(2)
+        col1.markdown(_SEARCH_TIPS_LEFT_MD)
+        col2.markdown(_SEARCH_TIPS_RIGHT_MD)
         
-        with col1:
-            st.markdown("**📝 Text & Content Searches:**")
-            st.markdown("• `iPhone` - Find products containing 'iPhone'")
-            st.markdown("• `john smith` - Search for names or multi-word terms")
-            st.markdown("• `premium quality` - Find items with specific descriptions")
-            st.markdown("• `2024` - Search by year or numbers")
-            
-            st.markdown("**🏷️ Category & Type Searches:**")
-            st.markdown("• `electronics` - Find items by category")
-            st.markdown("• `california` - Search by location")
-            st.markdown("• `manager` - Find by job title or role")
-            
-        with col2:
-            st.markdown("**🔤 Advanced Search Patterns:**")
-            st.markdown("• `\"exact phrase\"` - Search for exact phrases")
-            st.markdown("• `apple OR orange` - Find either term")
-            st.markdown("• `laptop -gaming` - Exclude specific terms")
-            st.markdown("• `price:>100` - Numeric filtering (if configured)")
-            
-            st.markdown("**📊 Common Use Cases:**")
-            st.markdown("• Product names, SKUs, or descriptions")
-            st.markdown("• Customer names, emails, or companies")
-            st.markdown("• Article titles, content, or tags")
-            st.markdown("• Locations, dates, or categories")
-        
-        st.markdown("---")
-        st.markdown("**⚡ Pro Tips:**")
-        st.markdown("• **Start simple**: Try single keywords first")
-        st.markdown("• **Use quotes**: For exact phrase matching")
-        st.markdown("• **Check spelling**: Algolia handles some typos but exact spelling works best")
-        st.markdown("• **Try variations**: Different words for the same concept")
-        st.markdown("• **Browse first**: Use the Indices tab to see what data is available")
-        st.markdown("• **Look for highlights**: Matching terms will be <span style='background-color: #ffeb3b; color: #000; padding: 2px 4px; border-radius: 3px; font-weight: bold;'>highlighted</span> in yellow", unsafe_allow_html=True)
+        st.markdown(_SEARCH_TIPS_PRO_MD, unsafe_allow_html=True)
         
         st.info("💡 **Not sure what to search?** Go to the **Indices** tab first to see your available data and understand what fields are searchable.")
  
 with tab6:
     # Import and call the upload functionality
     try:
-        # Add mcp-node to path if not already there
-        import sys
-        import os
-        
-        mcp_node_path = os.path.join(os.path.dirname(__file__), 'mcp-node')
-        if mcp_node_path not in sys.path:
-            sys.path.insert(0, mcp_node_path)
-        
-        
         # Get the API key from environment
         admin_key = os.getenv("ALGOLIA_API_KEY")
         
@@ -1606,10 +1709,6 @@ with tab7:
         st.stop()
     
     # Check for Azure OpenAI credentials
-    AZURE_ENDPOINT = os.getenv("AZURE_OPENAI_API_BASE")
-    AZURE_KEY = os.getenv("AZURE_OPENAI_API_KEY")
-    AZURE_VER = "2025-02-01-preview"
-    
     if not AZURE_ENDPOINT or not AZURE_KEY:
         st.error("❌ Azure OpenAI credentials not configured")
         st.markdown("""
@@ -1629,27 +1728,32 @@ with tab7:
     # Display chat history
     st.markdown("### 💬 Conversation")
     
-    # Create a container for chat messages
+    # Create a container for chat messages; only the most recent window is
+    # re-emitted on each rerun unless the user asks for the full transcript
+    chat_history = st.session_state.chat_history
+    hidden = len(chat_history) - _CHAT_WINDOW
     chat_container = st.container()
     with chat_container:
-        for message in st.session_state.chat_history:
+        if hidden > 0 and not st.toggle(f"Show {hidden} earlier messages", key="show_full_history"):
+            chat_history = chat_history[hidden:]
+        for message in chat_history:
             display_chat_message(message)
     
     # Chat input section
     st.markdown("---")
     st.markdown("### ✍️ Ask me anything about your Algolia data!")
     
-    # Chat input
-    col1, col2 = st.columns([4, 1])
-    with col1:
-        query = st.text_input(
-            "Your message:", 
-            placeholder="e.g., 'Show me all my indices' or 'Search for products in my store'",
-            key="chat_input"
-        )
-    with col2:
-        st.write("")  # Add spacing
-        send_button = st.button("💬 Send", type="primary", use_container_width=True)
+    # Chat input; the form only reruns the script on submit, not when the field loses focus
+    with st.form("chat_form", clear_on_submit=True, border=False):
+        col1, col2 = st.columns([4, 1], vertical_alignment="bottom")
+        with col1:
+            query = st.text_input(
+                "Your message:", 
+                placeholder="e.g., 'Show me all my indices' or 'Search for products in my store'",
+                key="chat_input"
+            )
+        with col2:
+            send_button = st.form_submit_button("💬 Send", type="primary", use_container_width=True)
     
     # Example buttons
     st.markdown("**💡 Quick Examples:**")
@@ -1694,21 +1798,11 @@ with tab7:
             st.error("❌ No MCP tools available. Please reconnect to MCP server.")
             st.stop()
         
-        # Build OpenAI tool specs
-        oa_tools, name_map = [], {}
-        for t in st.session_state.client.tools:
-            try:
-                oa_tools.append(to_openai_schema(t))
-                name_map[t.name] = t
-            except Exception as ex:
-                st.warning(f"⚠️ Skipped tool {t.name}: {ex}")
+        # OpenAI tool specs (tool schemas are fixed for the connection, so built once)
+        oa_tools, name_map = st.session_state.client.openai_tools()
         
         # Load system prompt
-        try:
-            with open("algolia_system_prompt.txt", encoding="utf-8") as f:
-                system_prompt = f.read()
-        except FileNotFoundError:
-            system_prompt = fallback_prompt(app_id)
+        system_prompt = load_system_prompt(app_id)
         
         # Initialize OpenAI messages if empty
         if not st.session_state.openai_messages:
@@ -1716,13 +1810,10 @@ with tab7:
         
         # Add user message to OpenAI messages
         st.session_state.openai_messages.append({"role": "user", "content": query})
+        st.session_state.openai_messages = trim_history(st.session_state.openai_messages)
         
-        # Create OpenAI client
-        client = AzureOpenAI(
-            azure_endpoint=AZURE_ENDPOINT,
-            api_key=AZURE_KEY,
-            api_version=AZURE_VER,
-        )
+        # Shared OpenAI client, reusing its HTTP connection pool across chat turns
+        client = get_azure_client(AZURE_ENDPOINT, AZURE_KEY, AZURE_VER)
         
         with st.spinner("🤖 AI is thinking and calling tools..."):
             try:
@@ -1743,11 +1834,13 @@ with tab7:
                     # Add assistant message with tool calls to OpenAI messages
                     st.session_state.openai_messages.append(res.choices[0].message)
                     preparer = ArgPreparer(app_id)
+                    tool_msgs = []
+                    pending = []   # (slot, call, tool name, arguments) awaiting execution
                     
                     for call in res.choices[0].message.tool_calls:
                         tname = call.function.name
                         try:
-                            raw_args = json.loads(call.function.arguments or "{}")
+                            raw_args = orjson.loads(call.function.arguments or "{}")
                         except json.JSONDecodeError:
                             st.error(f"❌ {tname}: Invalid JSON arguments")
                             continue
@@ -1776,7 +1869,7 @@ with tab7:
                             tool_calls_made.append(tool_call_obj)
                             
                             # Add tool response to OpenAI messages
-                            st.session_state.openai_messages.append({
+                            tool_msgs.append({
                                 "tool_call_id": call.id,
                                 "role": "tool",
                                 "name": tname,
@@ -1788,36 +1881,46 @@ with tab7:
                         for w in val.warnings:
                             st.info(f"ℹ️ {w}")
                         
-                        # Execute the tool
-                        exec_res = st.session_state.client.run_async(
-                            st.session_state.client.call_tool(tname, val.arguments))
-                        
+                        # Reserve this call's place so results keep the model's ordering
+                        pending.append((len(tool_calls_made), call, tname, val.arguments))
+                        tool_calls_made.append(None)
+                        tool_msgs.append(None)
+                    
+                    # Execute the validated tools together; tools that declare side effects run in order
+                    ordered = any(_has_side_effects(name_map[tname]) for _, _, tname, _ in pending)
+                    results = st.session_state.client.run_async(
+                        st.session_state.client.call_tools(
+                            [(tname, args) for _, _, tname, args in pending], concurrent=not ordered))
+                    
+                    for (slot, call, tname, args), exec_res in zip(pending, results):
                         # Create tool call object
-                        tool_call_obj = ToolCall(
+                        tool_calls_made[slot] = ToolCall(
                             name=tname,
-                            arguments=val.arguments,
+                            arguments=args,
                             result=exec_res["content"] if exec_res["success"] else {"error": exec_res["error"]},
                             success=exec_res["success"],
                             timestamp=get_timestamp()
                         )
-                        tool_calls_made.append(tool_call_obj)
                         
-                        # Serialize and add to OpenAI messages  
+                        # Serialize the tool response for OpenAI
                         serial_content = serialise(exec_res["content"]) if exec_res["success"] else {"error": exec_res["error"]}
-                        st.session_state.openai_messages.append({
+                        tool_msgs[slot] = {
                             "tool_call_id": call.id,
                             "role": "tool",
                             "name": tname,
-                            "content": json.dumps(serial_content)
-                        })
+                            "content": orjson.dumps(serial_content).decode()
+                        }
+                    st.session_state.openai_messages.extend(tool_msgs)
                     
-                    # Get final response from AI
-                    final_response = client.chat.completions.create(
+                    # Get final response from AI, streamed token by token into the conversation
+                    final_stream = client.chat.completions.create(
                         model="gpt-4o",
                         messages=st.session_state.openai_messages,
                         temperature=0.3,
+                        stream=True,
                     )
-                    assistant_message_content = final_response.choices[0].message.content
+                    with chat_container, st.chat_message("assistant"):
+                        assistant_message_content = st.write_stream(stream_text(final_stream)) or ""
                     
                     # Add final assistant message to OpenAI messages
                     st.session_state.openai_messages.append({
@@ -1881,16 +1984,3 @@ with tab7:
             """)
         
         st.info("💡 **Tip:** Just ask in natural language! I'll figure out which tools to use and help you get the answers you need.")
-
-
-# ──────────────────────────────────
-# tidy shutdown
-# ──────────────────────────────────
-def _cleanup():
-    try:
-        if "client" in st.session_state and st.session_state.client:
-            st.session_state.client.run_async(
-                st.session_state.client.disconnect())
-    except Exception:
-        pass
-atexit.register(_cleanup)
\ No newline at end of file